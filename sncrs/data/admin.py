@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.contrib import messages
 from django.utils.translation import ngettext
 from django.shortcuts import render
+from django.http import HttpResponseRedirect
+from django.urls import reverse
 
 from itertools import chain
 
@@ -11,12 +13,12 @@ from .models import (
     Person, SmashNight, Team, Match, StageType, Stage,
     MatchupType, Matchup, Medal, PersonSnapshot, Greeting, Clip,
     ClipTag, QuoteTag, QuoteSpeaker, Quote, Whine, SocialLink, Site,
-    Lesson, TwitchToken, GameTitle,
+    Lesson, TwitchToken, GameTitle, UpdateRun, Job,
 )
 
 from .forms import TeamForm, StageTypeForm, MatchupTypeForm
-from .sn_calculate import full_update
-from .youtube_logic import set_videos
+from .challonge_logic import CACHE_REFRESH, CACHE_BYPASS
+from .job_logic import enqueue_jobs
 # Register your models here.
 
 
@@ -77,19 +79,43 @@ class SmashNightAdmin(admin.ModelAdmin):
         BracketInline,
         AttendeeInline
     ]
-    actions = ['full_update_selected', 'show_youtube_details', 'set_youtube_videos']
+    actions = [
+        'full_update_selected',
+        'full_update_refresh_challonge_selected',
+        'full_update_bypass_challonge_cache_selected',
+        'full_update_and_verify_selected',
+        'show_youtube_details',
+        'set_youtube_videos',
+    ]
+
+    def queue_jobs(self, request, queryset, kind, **options):
+        jobs = enqueue_jobs(kind, queryset.order_by('-date'), **options)
+        self.message_user(request, ngettext(
+            '%d job was queued.',
+            '%d jobs were queued.',
+            len(jobs),
+        ) % len(jobs), messages.SUCCESS)
+        # Follow the queued jobs on the job status page
+        return HttpResponseRedirect(reverse('admin:data_job_changelist'))
+
+    def run_full_update(self, request, queryset, **update_kwargs):
+        return self.queue_jobs(request, queryset, Job.Kind.FULL_UPDATE, **update_kwargs)
 
     @admin.action(description="Get all data associated with the selected SmashNights and update scores")
     def full_update_selected(self, request, queryset):
-        count = 0
-        for sn in queryset.order_by('-date'):
-            full_update(sn)
-            count += 1
-        self.message_user(request, ngettext(
-            '%d SmashNight was successfully updated.',
-            '%d SmashNights were successfully updated.',
-            count,
-        ) % count, messages.SUCCESS)
+        return self.run_full_update(request, queryset)
+
+    @admin.action(description="Update the selected SmashNights, refetching and recaching all Challonge data")
+    def full_update_refresh_challonge_selected(self, request, queryset):
+        return self.run_full_update(request, queryset, cache_mode=CACHE_REFRESH)
+
+    @admin.action(description="Update the selected SmashNights without reading or writing the Challonge cache")
+    def full_update_bypass_challonge_cache_selected(self, request, queryset):
+        return self.run_full_update(request, queryset, cache_mode=CACHE_BYPASS)
+
+    @admin.action(description="Update the selected SmashNights and verify matchups against a full rebuild")
+    def full_update_and_verify_selected(self, request, queryset):
+        return self.run_full_update(request, queryset, verify=True)
 
     @admin.action(description="Show youtube titles and descriptions")
     def show_youtube_details(self, request, queryset):
@@ -110,15 +136,34 @@ class SmashNightAdmin(admin.ModelAdmin):
 
     @admin.action(description="Set the youtube videos for a smashNight")
     def set_youtube_videos(self, request, queryset):
-        count = 0
-        for sn in queryset.order_by('-date'):
-            set_videos(sn)
-            count += 1
-        self.message_user(request, ngettext(
-            '%d SmashNight was successfully updated.',
-            '%d SmashNights were successfully updated.',
-            count,
-        ) % count, messages.SUCCESS)
+        return self.queue_jobs(request, queryset, Job.Kind.YOUTUBE_VIDEOS)
+
+
+class UpdateRunAdmin(admin.ModelAdmin):
+    list_display = ['sn', 'started_at', 'finished_at', 'status', 'stage_summary']
+    list_filter = ['status']
+    readonly_fields = ['sn', 'started_at', 'finished_at', 'status', 'stage_summary', 'error']
+    exclude = ['stages']
+
+    def has_add_permission(self, request):
+        return False
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'sn', 'status', 'progress', 'created_at', 'started_at', 'finished_at', 'stage_summary']
+    list_filter = ['status', 'kind']
+    list_select_related = ['sn', 'update_run']
+    readonly_fields = [
+        'kind', 'sn', 'options', 'status', 'progress', 'created_at', 'started_at', 'finished_at',
+        'update_run', 'stage_summary', 'error',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Stages")
+    def stage_summary(self, job):
+        return job.update_run.stage_summary() if job.update_run else ""
 
 
 class TeamAdmin(admin.ModelAdmin):
@@ -154,6 +199,8 @@ admin.site.register(Character)
 admin.site.register(Team, TeamAdmin)
 admin.site.register(Person, PersonAdmin)
 admin.site.register(SmashNight, SmashNightAdmin)
+admin.site.register(UpdateRun, UpdateRunAdmin)
+admin.site.register(Job, JobAdmin)
 admin.site.register(Bracket, BracketAdmin)
 admin.site.register(Match)
 admin.site.register(Attendee)
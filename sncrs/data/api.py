@@ -6,7 +6,7 @@ from data.views import (
     GreetingList, MatchupList, MedalList, ClipList, ClipTagList,
     ClipDeleteEditView, QuoteList, QuoteDeleteView, QuoteTagList,
     WhineList,SocialLinkList, LessonList, TwitchTokenList,
-    GameTitleList,
+    GameTitleList, ScoringSimulationView,
 )
 
 urlpatterns = [
@@ -28,7 +28,8 @@ urlpatterns = [
     path('socials/', SocialLinkList.as_view(), name='socials'),
     path('lessons/', LessonList.as_view(), name='lessons'),
     path('twitch_tokens/', TwitchTokenList.as_view(), name='twitch_tokens'),
-    path('game_titles/', GameTitleList.as_view(), name='game_titles')
+    path('game_titles/', GameTitleList.as_view(), name='game_titles'),
+    path('scoring_simulation/', ScoringSimulationView.as_view(), name='scoring_simulation'),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
\ No newline at end of file
@@ -0,0 +1,73 @@
+# cache_logic.py
+
+# Page caching
+# The public pages only change when a SmashNight is recomputed or an admin edits
+# the data they show, so their rendered content is cached until then.
+# Cached content is keyed by a global data version. Bumping the version
+# makes all of it stale at once, and stale entries simply expire.
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+
+DATA_VERSION_KEY = "data_version"
+
+
+def get_data_version() -> int:
+    """Return the current data version, starting a new one if none is stored"""
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        # Start from the clock, so a lost version can't come back as one already used
+        cache.add(DATA_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version() -> int:
+    """Make every cached page stale"""
+    try:
+        return cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(DATA_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def bump_data_version_on_commit():
+    """Make every cached page stale once the current transaction commits"""
+    transaction.on_commit(bump_data_version)
+
+
+def get_cached_content(name: str, template_name: str, get_context, *vary_on) -> SafeString:
+    """
+    Get the rendered content of a public page, rendering and caching it if it isn't cached.
+    The content is rendered without the request, so anything that needs it,
+    such as a form with a CSRF token, has to stay in the page around it.
+
+    Parameters
+    ----------
+    name : str
+        The name of the content, unique among the pages
+    template_name : str
+        The template the content is rendered from
+    get_context : callable
+        Builds the template context. Only called when the content isn't cached
+    vary_on
+        Anything else the content depends on, such as the selected season
+
+    Returns
+    -------
+    SafeString
+        The rendered content
+    """
+    key = make_template_fragment_key(name, [get_data_version(), *vary_on])
+    content = cache.get(key)
+    if content is None:
+        content = render_to_string(template_name, get_context())
+        cache.set(key, content, settings.PAGE_CACHE_TIMEOUT)
+    return mark_safe(content)
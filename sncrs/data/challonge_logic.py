@@ -0,0 +1,183 @@
+# challonge_logic.py
+
+# Fetching bracket data from Challonge
+# All brackets of a SmashNight are fetched concurrently through one
+# bounded connection pool, before anything is written to the database.
+# Responses are cached on disk by tournament, so recomputes can run offline.
+
+import dataclasses
+import gzip
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Tuple
+
+import httpx
+from challonge import Client, Participant, Match as ChallongeMatch
+from django.conf import settings
+
+
+CHALLONGE_URL_PREFIX = "https://challonge.com/"
+# Set this to send API requests somewhere else, such as a local fake Challonge server
+CHALLONGE_API_URL = os.environ.get('CHALLONGE_API_URL', '')
+CHALLONGE_MAX_CONNECTIONS = int(os.environ.get('CHALLONGE_MAX_CONNECTIONS', 6))
+
+# Cache modes
+# use: read fresh cached data, fetch and store anything missing or stale
+# refresh: always fetch, and store the new data
+# bypass: always fetch, and leave the cache alone
+CACHE_USE = "use"
+CACHE_REFRESH = "refresh"
+CACHE_BYPASS = "bypass"
+
+
+class ChallongeApiTransport(httpx.HTTPTransport):
+    """Send requests for api.challonge.com/v1 to the given api_url instead"""
+
+    def __init__(self, api_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.api_url = httpx.URL(api_url)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        api_path = request.url.path.removeprefix("/v1")
+        request.url = request.url.copy_with(
+            scheme=self.api_url.scheme,
+            host=self.api_url.host,
+            port=self.api_url.port,
+            path=self.api_url.path.rstrip("/") + api_path,
+        )
+        request.headers["Host"] = request.url.netloc.decode()
+        return super().handle_request(request)
+
+
+class PooledClient(Client):
+    """
+    A challonge Client that sends its requests through a shared httpx Client.
+    pychallonge has no public way to pass one in, so this replaces its private _http
+    attribute, and requirements.txt pins pychallonge to the minor version this was written against.
+    """
+
+    def __init__(self, http_client: httpx.Client):
+        super().__init__(user=os.environ.get('CHALLONGE_USER'), api_key=os.environ.get('CHALLONGE_KEY'))
+        self._http.close()
+        self._http = http_client
+
+    def close(self):
+        # The shared httpx Client is closed by whoever opened it
+        pass
+
+
+def get_http_client(max_connections: int = CHALLONGE_MAX_CONNECTIONS) -> httpx.Client:
+    """Create an httpx Client with a bounded connection pool for Challonge requests"""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    transport = ChallongeApiTransport(CHALLONGE_API_URL, limits=limits) if CHALLONGE_API_URL else None
+    return httpx.Client(limits=limits, transport=transport)
+
+
+def get_tournament_slug(url: str) -> str:
+    return url.replace(CHALLONGE_URL_PREFIX, "")
+
+
+def get_cache_path(slug: str) -> Path:
+    return Path(settings.CHALLONGE_CACHE_DIR) / (re.sub(r'[^\w-]', '_', slug) + ".json.gz")
+
+
+def to_json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def from_cached_dict(target_class, data: dict):
+    return target_class(**{
+        key: datetime.fromisoformat(value) if key.endswith("_at") and isinstance(value, str) else value
+        for key, value in data.items()
+    })
+
+
+def read_cached_bracket_data(slug: str):
+    """
+    Get the cached participants and matches for a tournament, or None if they are
+    not cached or have expired. Completed tournaments never expire.
+    """
+    try:
+        with gzip.open(get_cache_path(slug), "rt") as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    is_complete = cached["state"] == "complete"
+    if not is_complete and time.time() - cached["fetched_at"] > settings.CHALLONGE_CACHE_TTL:
+        return None
+    participants = [from_cached_dict(Participant, participant) for participant in cached["participants"]]
+    matches = [from_cached_dict(ChallongeMatch, match) for match in cached["matches"]]
+    return participants, matches
+
+
+def write_cached_bracket_data(slug: str, state: str, participants: list, matches: list) -> None:
+    """Store the participants and matches for a tournament as compressed JSON"""
+    cache_path = get_cache_path(slug)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cached = {
+        "fetched_at": time.time(),
+        "state": state,
+        "participants": [dataclasses.asdict(participant) for participant in participants],
+        "matches": [dataclasses.asdict(match) for match in matches],
+    }
+    # Write to a temporary file first, so a reader never sees a partial file
+    with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix=".tmp", delete=False) as temp_file:
+        with gzip.open(temp_file, "wt") as cache_file:
+            json.dump(cached, cache_file, default=to_json_value)
+    os.replace(temp_file.name, cache_path)
+
+
+def fetch_bracket_data(url: str, http_client: httpx.Client, cache_mode: str = CACHE_USE) -> Tuple[list, list]:
+    """Get the participants and matches for the Challonge bracket at url"""
+    slug = get_tournament_slug(url)
+    if cache_mode == CACHE_USE:
+        cached = read_cached_bracket_data(slug)
+        if cached is not None:
+            return cached
+    challonge_client = PooledClient(http_client)
+    # get the challonge tournament
+    tournament = challonge_client.tournaments.show(slug)
+    # get all participants from challonge
+    participants = challonge_client.participants.index(tournament.id)
+    # get all matches from challonge
+    matches = challonge_client.matches.index(tournament.id)
+    if cache_mode != CACHE_BYPASS:
+        write_cached_bracket_data(slug, tournament.state, participants, matches)
+    return participants, matches
+
+
+def fetch_all_bracket_data(brackets, cache_mode: str = CACHE_USE) -> dict[int, Tuple[list, list]]:
+    """
+    Get the participants and matches for every given bracket, fetching the
+    brackets concurrently. Nothing is written to the database here.
+
+    Parameters
+    ----------
+    brackets: iterable of Bracket
+        The brackets to fetch from Challonge
+    cache_mode: str
+        CACHE_USE, CACHE_REFRESH or CACHE_BYPASS
+
+    Returns
+    -------
+    dict
+        Maps each bracket's pk to its (participants, matches)
+    """
+    brackets = list(brackets)
+    if not brackets:
+        return {}
+    with get_http_client() as http_client:
+        with ThreadPoolExecutor(max_workers=min(len(brackets), CHALLONGE_MAX_CONNECTIONS)) as executor:
+            futures = {
+                bracket.pk: executor.submit(fetch_bracket_data, bracket.url, http_client, cache_mode)
+                for bracket in brackets
+            }
+            return {bracket_pk: future.result() for bracket_pk, future in futures.items()}
@@ -4,7 +4,7 @@ from django.forms.fields import MultipleChoiceField
 from data.models import (
     Match, PersonSnapshot, SmashNight, Person,
     Greeting, Matchup, Medal, Clip, ClipTag, Quote, QuoteTag, Whine,
-    SocialLink, Lesson, GameTitle
+    SocialLink, Lesson, GameTitle, PersonName,
 )
 
 class CaseInsensitiveMultipleChoiceField(MultipleChoiceField):
@@ -112,12 +112,10 @@ class PersonFilter(filters.FilterSet):
         ]
     
     def all_names_filter(self, queryset, name, value):
-        """Create a query filtering both display name and aliases on the field
-        specified by field_name, for the value in value"""
-        player = value
-        display_name_arg = {f'display_name__iexact': player}
-        alias_arg = {f'alias__name__iexact': player}
-        return queryset.filter(Q(**display_name_arg) | Q(**alias_arg)).distinct()
+        """Create a query filtering both display name and aliases,
+        for the value in value"""
+        matching_names = PersonName.objects.filter_by_name(value)
+        return queryset.filter(pk__in=matching_names.values('person'))
 
 
 class GreetingFilter(filters.FilterSet):
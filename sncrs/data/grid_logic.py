@@ -0,0 +1,211 @@
+# grid_logic.py
+
+# Page grids
+# The week and placement pages show a cell for every member at every SmashNight,
+# and the matchups page shows a cell for every pair of members in each game.
+# Each grid is built from one query per table, indexed by the grid's rows and columns,
+# so the number of queries doesn't grow with the size of the grid.
+
+from collections import defaultdict
+
+from django.db.models import Count
+
+from .models import Attendee, Matchup, MatchupType, Person, PersonSnapshot
+from .scoring_logic import get_placement_score_change
+
+EMPTY_CELL = "--"
+
+NO_MATCHUP_COLOR = "#333333"
+SELF_MATCHUP_COLOR = "#111111"
+
+
+def get_week_grid(people, sns) -> list:
+    """
+    Get every member's rank and score after each SmashNight
+
+    Parameters
+    ----------
+    people: list[Person]
+        The rows of the grid
+    sns: list[SmashNight]
+        The columns of the grid, in order
+
+    Returns
+    -------
+    list
+        A (person, cells) pair for each person, where cells holds an
+        (end rank, end score) pair for each SmashNight
+    """
+    snapshots = defaultdict(dict)
+    for person_id, sn_id, end_rank, end_score in (
+        PersonSnapshot.objects.filter(sn__in=sns, person__in=people).order_by()
+        .values_list('person_id', 'sn_id', 'end_rank', 'end_score')
+    ):
+        snapshots[person_id][sn_id] = (end_rank, end_score)
+
+    empty_cell = (EMPTY_CELL, EMPTY_CELL)
+    return [
+        (person, [snapshots[person.pk].get(sn.pk, empty_cell) for sn in sns])
+        for person in people
+    ]
+
+
+def get_placement_grid(people, sns) -> list:
+    """
+    Get every member's seed, placement and placement score change at each SmashNight
+
+    Parameters
+    ----------
+    people: list[Person]
+        The rows of the grid
+    sns: list[SmashNight]
+        The columns of the grid, in order
+
+    Returns
+    -------
+    list
+        A (person, cells) pair for each person, where cells holds a
+        (start seed, end seed, placement score change) triple for each SmashNight
+    """
+    headcounts = dict(
+        Attendee.objects.filter(sn__in=sns).order_by()
+        .values('sn').annotate(headcount=Count('pk'))
+        .values_list('sn', 'headcount')
+    )
+    attendees = defaultdict(dict)
+    for person_id, sn_id, start_seed, end_seed, status in (
+        Attendee.objects.filter(sn__in=sns, person__in=people).order_by()
+        .values_list('person_id', 'sn_id', 'start_seed', 'end_seed', 'person__status')
+    ):
+        placement_score_change = get_placement_score_change(
+            status == Person.ELITE, start_seed, end_seed, headcounts[sn_id]
+        )
+        attendees[person_id][sn_id] = (start_seed, end_seed, round(placement_score_change, 2))
+
+    empty_cell = (EMPTY_CELL, EMPTY_CELL, EMPTY_CELL)
+    return [
+        (person, [attendees[person.pk].get(sn.pk, empty_cell) for sn in sns])
+        for person in people
+    ]
+
+
+def get_matchup_index(people, game_titles) -> dict:
+    """
+    Load every matchup between the given people in the given games with one query
+
+    Returns
+    -------
+    dict
+        The matchups, keyed by (game title id, px id, py id)
+    """
+    return {
+        (matchup.game_title_id, matchup.px_id, matchup.py_id): matchup
+        for matchup in Matchup.original_objects.filter(
+            px__in=people, py__in=people, game_title__in=game_titles
+        ).select_related('matchup_type', 'set_matchup_type').order_by()
+    }
+
+
+def get_matchup_totals(matchup: Matchup) -> tuple[int, int, int, int]:
+    """Get a matchup's total game and set wins for px and py, counting the additional wins"""
+    return (
+        (matchup.px_wins or 0) + matchup.px_additional_wins,
+        (matchup.py_wins or 0) + matchup.py_additional_wins,
+        (matchup.px_set_wins or 0) + matchup.px_additional_set_wins,
+        (matchup.py_set_wins or 0) + matchup.py_additional_set_wins,
+    )
+
+
+def get_matchup_cell(px_wins: int, py_wins: int, matchup_type: MatchupType, is_self: bool) -> tuple[str, str]:
+    """Get the background color and text of a matchup grid cell"""
+    if px_wins or py_wins:
+        return matchup_type.color if matchup_type else "", f"{px_wins}:{py_wins}"
+    if is_self:
+        return SELF_MATCHUP_COLOR, "X"
+    return NO_MATCHUP_COLOR, ""
+
+
+def get_matchup_grids(people, game_titles) -> list:
+    """
+    Get the game and set matchup grids between every pair of members for each game
+
+    Parameters
+    ----------
+    people: list[Person]
+        The rows and columns of each grid
+    game_titles: list[GameTitle]
+        The games to build grids for
+
+    Returns
+    -------
+    list
+        A (game title, game rows, set rows) triple for each game, where each row is
+        a (person, cells) pair and each cell is a (background color, text) pair
+    """
+    matchups = get_matchup_index(people, game_titles)
+    empty_cell = (NO_MATCHUP_COLOR, "")
+    grids = []
+    for game_title in game_titles:
+        game_rows = []
+        set_rows = []
+        for person_x in people:
+            game_cells = []
+            set_cells = []
+            for person_y in people:
+                matchup = matchups.get((game_title.pk, person_x.pk, person_y.pk))
+                if matchup is None:
+                    game_cells.append(empty_cell)
+                    set_cells.append(empty_cell)
+                    continue
+                px_wins, py_wins, px_set_wins, py_set_wins = get_matchup_totals(matchup)
+                is_self = matchup.px_id == matchup.py_id
+                game_cells.append(get_matchup_cell(px_wins, py_wins, matchup.matchup_type, is_self))
+                set_cells.append(get_matchup_cell(px_set_wins, py_set_wins, matchup.set_matchup_type, is_self))
+            game_rows.append((person_x, game_cells))
+            set_rows.append((person_x, set_cells))
+        grids.append((game_title, game_rows, set_rows))
+    return grids
+
+
+def get_matchup_grid_data(people, game_titles) -> dict:
+    """
+    Get the matchup grids in a compact form that can be sent as JSON and drawn by the browser
+
+    Parameters
+    ----------
+    people: list[Person]
+        The rows and columns of each grid
+    game_titles: list[GameTitle]
+        The games to include
+
+    Returns
+    -------
+    dict
+        people: [id, display name] for each person, in grid order
+        matchup_types: the color of each matchup type, keyed by id
+        game_titles: the id, name and matchups of each game, where each matchup is
+            [px index, py index, px game wins, py game wins, px set wins, py set wins,
+            matchup type id, set matchup type id] and pairs without a matchup are left out
+    """
+    matchups = get_matchup_index(people, game_titles)
+    person_indices = {person.pk: index for index, person in enumerate(people)}
+    matchups_by_game = defaultdict(list)
+    matchup_types = {}
+    for (game_title_id, px_id, py_id), matchup in matchups.items():
+        for matchup_type in (matchup.matchup_type, matchup.set_matchup_type):
+            if matchup_type is not None:
+                matchup_types[matchup_type.pk] = matchup_type.color
+        matchups_by_game[game_title_id].append([
+            person_indices[px_id], person_indices[py_id], *get_matchup_totals(matchup),
+            matchup.matchup_type_id, matchup.set_matchup_type_id,
+        ])
+    for game_matchups in matchups_by_game.values():
+        game_matchups.sort()
+    return {
+        "people": [[person.pk, person.display_name] for person in people],
+        "matchup_types": matchup_types,
+        "game_titles": [
+            {"id": game_title.pk, "name": game_title.name, "matchups": matchups_by_game[game_title.pk]}
+            for game_title in game_titles
+        ],
+    }
@@ -0,0 +1,84 @@
+# job_logic.py
+
+# Background job queue
+# Admin actions enqueue Jobs in the database, and the run_jobs worker claims
+# and runs them one at a time. Workers claim jobs with SELECT ... FOR UPDATE
+# SKIP LOCKED, so no job is run twice.
+
+import logging
+import traceback
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job, UpdateRun
+from .sn_calculate import full_update, write_outside_transaction
+from .youtube_logic import set_videos
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_jobs(kind, sns, **options) -> list[Job]:
+    """Queue a job of the given kind for each SmashNight"""
+    return Job.objects.bulk_create([Job(kind=kind, sn=sn, options=options) for sn in sns])
+
+
+def claim_next_job():
+    """Mark the oldest queued job as running and return it, or None if the queue is empty"""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED)
+            .order_by('created_at', 'pk')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.Status.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def fail_interrupted_jobs() -> int:
+    """Mark jobs left running by a stopped worker as failed"""
+    return Job.objects.filter(status=Job.Status.RUNNING).update(
+        status=Job.Status.FAILED,
+        finished_at=timezone.now(),
+        error="The worker stopped before this job finished",
+    )
+
+
+def report_progress(job, progress):
+    """
+    Record a job's progress where the admin can see it straight away.
+    A full update runs its stages in one transaction, so the progress is
+    written outside of it.
+    """
+    write_outside_transaction(
+        lambda: Job.objects.filter(pk=job.pk).update(progress=progress), f"progress for job {job.pk}"
+    )
+
+
+def run_job(job):
+    """Run a claimed job and record its result"""
+    logger.info(f"Running {job}")
+    try:
+        if job.kind == Job.Kind.FULL_UPDATE:
+            # Link the update record first, so its stages show up even if the update fails
+            job.update_run = UpdateRun.objects.create(sn=job.sn)
+            job.save(update_fields=['update_run'])
+            full_update(
+                job.sn, on_stage=lambda name: report_progress(job, name), update_run=job.update_run, **job.options
+            )
+        elif job.kind == Job.Kind.YOUTUBE_VIDEOS:
+            set_videos(job.sn)
+    except Exception:
+        logger.exception(f"{job} failed")
+        job.status = Job.Status.FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = Job.Status.SUCCEEDED
+    job.progress = ""
+    job.finished_at = timezone.now()
+    job.save()
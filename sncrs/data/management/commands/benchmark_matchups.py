@@ -0,0 +1,79 @@
+import time
+from itertools import combinations
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from data.models import GameTitle, Match, Matchup, Person, SmashNight
+
+
+def rebuild_per_pair(game_title: GameTitle) -> None:
+    """The matchups table rebuild as it was before the grouped query, with two aggregates and two upserts per pair"""
+    match_queryset = Match.objects.filter(p1_wins__gte=0, p2_wins__gte=0, game_title=game_title)
+    for person_x, person_y in combinations(Person.objects.all(), 2):
+        px_wins, py_wins = match_queryset.get_player_game_wins(person_x, person_y)
+        px_set_wins, py_set_wins = match_queryset.get_player_set_wins(person_x, person_y)
+        Matchup.objects.update_or_create(
+            px=person_x, py=person_y, game_title=game_title,
+            defaults=dict(px_wins=px_wins, py_wins=py_wins, px_set_wins=px_set_wins, py_set_wins=py_set_wins),
+        )
+        Matchup.objects.update_or_create(
+            px=person_y, py=person_x, game_title=game_title,
+            defaults=dict(px_wins=py_wins, py_wins=px_wins, px_set_wins=py_set_wins, py_set_wins=px_set_wins),
+        )
+    Matchup.objects.filter(game_title=game_title).set_matchup_types()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how long the matchups table takes to rebuild in full, and to update for only "
+        "the latest SmashNight. Everything runs in a transaction that is rolled back, so nothing is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--per-pair', action='store_true',
+            help="Also time the old rebuild, which queries each pair of people separately. This can take minutes."
+        )
+
+    def time_step(self, label: str, step) -> None:
+        query_count = 0
+
+        def count_query(execute, *args):
+            nonlocal query_count
+            query_count += 1
+            return execute(*args)
+
+        with connection.execute_wrapper(count_query):
+            start_time = time.perf_counter()
+            step()
+            elapsed = time.perf_counter() - start_time
+        self.stdout.write(f"  {label:>19}: {elapsed:8.2f}s, {query_count:>7} queries")
+
+    def get_table(self, game_title: GameTitle) -> list:
+        return sorted(
+            Matchup.original_objects.filter(game_title=game_title)
+            .values_list('px', 'py', 'px_wins', 'py_wins', 'px_set_wins', 'py_set_wins', 'matchup_type')
+        )
+
+    def handle(self, *args, per_pair, **options):
+        with transaction.atomic():
+            for game_title in GameTitle.objects.all():
+                sn = SmashNight.objects.filter(match__game_title=game_title).order_by('-date').first()
+                if sn is None:
+                    continue
+                self.stdout.write(
+                    f"{game_title}: {Person.objects.count()} people, "
+                    f"{Match.original_objects.filter(game_title=game_title).count()} matches, latest night {sn}"
+                )
+                if per_pair:
+                    self.time_step("per pair rebuild", lambda: rebuild_per_pair(game_title))
+                    per_pair_table = self.get_table(game_title)
+                self.time_step("full rebuild", lambda: Matchup.objects.create_or_update_matchups_table(game_title))
+                full_table = self.get_table(game_title)
+                if per_pair and per_pair_table != full_table:
+                    self.stdout.write(self.style.WARNING("  The per pair and full rebuilds differ"))
+                self.time_step("latest night update", lambda: Matchup.objects.update_matchups_for_sn(sn, game_title))
+                if self.get_table(game_title) != full_table:
+                    self.stdout.write(self.style.WARNING("  The update changed the rebuilt table"))
+            transaction.set_rollback(True)
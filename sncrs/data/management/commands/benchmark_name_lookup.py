@@ -0,0 +1,58 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from data.models import Person, PersonName, Alias
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure name lookup latency as the Person and Alias tables grow. "
+        "Benchmark rows are created in a transaction that is rolled back, so nothing is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000, 50000])
+        parser.add_argument('--lookups', type=int, default=500)
+
+    def handle(self, *args, sizes, lookups, **options):
+        with transaction.atomic():
+            created = 0
+            for size in sorted(sizes):
+                people = Person.objects.bulk_create(
+                    Person(display_name=f"Benchmark Player {number}") for number in range(created, size)
+                )
+                Alias.objects.bulk_create(
+                    Alias(person=person, name=f"BENCHMARK ALIAS {person.display_name}") for person in people
+                )
+                created = max(created, size)
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute("ANALYZE data_person, data_alias")
+                names = [
+                    random.choice([f"benchmark player {number}", f"benchmark alias benchmark player {number}"])
+                    for number in random.choices(range(created), k=lookups)
+                ]
+                with CaptureQueriesContext(connection) as queries:
+                    start_time = time.perf_counter()
+                    for name in names:
+                        Person.objects.get_person(name)
+                    elapsed = time.perf_counter() - start_time
+                with CaptureQueriesContext(connection) as batch_queries:
+                    start_time = time.perf_counter()
+                    Person.objects.resolve_names(names)
+                    batch_elapsed = time.perf_counter() - start_time
+                self.stdout.write(
+                    f"{Person.objects.count():>8} people, {Alias.objects.count():>8} aliases: "
+                    f"{elapsed / lookups * 1000:.3f} ms per lookup ({len(queries) / lookups:g} queries each), "
+                    f"{batch_elapsed * 1000:.1f} ms to resolve all {lookups} at once ({len(batch_queries)} queries)"
+                )
+            if connection.vendor == 'postgresql':
+                # The plan should use the lowercase name indexes, not scan the tables
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN {PersonName.objects.filter_by_name(names[0]).values('person').query}")
+                    self.stdout.write("\n".join(row[0] for row in cursor.fetchall()))
+            transaction.set_rollback(True)
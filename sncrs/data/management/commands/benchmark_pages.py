@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from data.cache_logic import bump_data_version
+from data.views import home_view, week_view, placement_scores_view, players_view, matchups_view
+
+PAGES = {
+    'home': home_view,
+    'week': week_view,
+    'placement_scores': placement_scores_view,
+    'players': players_view,
+    'matchups': matchups_view,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how long the public pages take to render with an empty page cache, "
+        "and again once they are cached. The page cache is made stale first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=list(PAGES))
+        parser.add_argument('--repeat', type=int, default=5, help="How many cached renders to average")
+
+    def handle(self, *args, pages, repeat, **options):
+        request_factory = RequestFactory()
+        bump_data_version()
+        for page in pages:
+            view = PAGES[page]
+            timings = []
+            for attempt in range(repeat + 1):
+                request = request_factory.get(f'/{page}/')
+                with CaptureQueriesContext(connection) as queries:
+                    start_time = time.perf_counter()
+                    view(request)
+                    timings.append((time.perf_counter() - start_time, len(queries)))
+            cold_time, cold_queries = timings[0]
+            warm_time = sum(elapsed for elapsed, _ in timings[1:]) / repeat
+            warm_queries = max(query_count for _, query_count in timings[1:])
+            self.stdout.write(
+                f"{page:>16}: cold {cold_time * 1000:8.1f} ms, {cold_queries:>5} queries | "
+                f"cached {warm_time * 1000:8.1f} ms, {warm_queries:>5} queries"
+            )
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from data.models import GameTitle, PersonRivalry
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild everyone's precomputed top rivals and demons from the matchups table. "
+        "The migration fills the table and full updates keep it current, so this is only needed to repair it."
+    )
+
+    def handle(self, *args, **options):
+        for game_title in GameTitle.objects.all():
+            start_time = time.perf_counter()
+            PersonRivalry.objects.rebuild(game_title)
+            self.stdout.write(
+                f"{game_title}: {PersonRivalry.objects.filter(game_title=game_title).count()} rivalries "
+                f"in {time.perf_counter() - start_time:.2f}s"
+            )
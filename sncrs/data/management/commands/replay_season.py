@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from data.replay_logic import load_season, replay_season, get_replay_differences, write_replay
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every score of a season in memory from its matches, placements and attendees, "
+        "and list where the result differs from the database. "
+        "With --write, the recomputed scores are saved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('season', type=int)
+        parser.add_argument('--write', action='store_true', help="Save the recomputed scores")
+        parser.add_argument('--limit', type=int, default=50, help="The most differences to list")
+
+    def handle(self, *args, season, write, limit, **options):
+        start_time = time.perf_counter()
+        data = load_season(season)
+        loaded_time = time.perf_counter()
+        result = replay_season(data)
+        replayed_time = time.perf_counter()
+        self.stdout.write(
+            f"Season {season}: {len(data.sns)} nights, {len(result.matches)} matches, "
+            f"{len(result.attendees)} attendees loaded in {loaded_time - start_time:.2f}s "
+            f"and replayed in {replayed_time - loaded_time:.2f}s"
+        )
+
+        differences = get_replay_differences(data, result)
+        for table, key, column, stored, replayed in differences[:limit]:
+            self.stdout.write(f"{table} {key} {column}: stored {stored}, replayed {replayed}")
+        if len(differences) > limit:
+            self.stdout.write(f"... and {len(differences) - limit} more")
+        self.stdout.write(f"{len(differences)} differences")
+
+        if write:
+            write_replay(data, result)
+            self.stdout.write(f"Wrote the replayed scores in {time.perf_counter() - replayed_time:.2f}s")
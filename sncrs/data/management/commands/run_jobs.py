@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from data.job_logic import claim_next_job, fail_interrupted_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued admin jobs, such as full SmashNight updates, in the background. "
+        "Jobs still marked as running when the worker starts are marked as failed, "
+        "so run a single worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=2.0, help="Seconds to wait between checks of an empty queue")
+        parser.add_argument('--once', action='store_true', help="Run every queued job, then exit")
+
+    def handle(self, *args, poll, once, **options):
+        interrupted = fail_interrupted_jobs()
+        if interrupted:
+            self.stdout.write(f"Marked {interrupted} interrupted jobs as failed")
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll)
+                continue
+            run_job(job)
+            self.stdout.write(f"Finished {job}")
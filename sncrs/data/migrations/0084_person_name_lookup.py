@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:02
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+# One row per display name or alias. Ids are interleaved so they stay unique across both tables
+CREATE_PERSON_NAME_VIEW = """
+CREATE VIEW data_personname AS
+    SELECT 2 * id AS id, id AS person_id, display_name AS name FROM data_person
+    UNION ALL
+    SELECT 2 * id + 1 AS id, person_id, name FROM data_alias
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0083_medal'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_PERSON_NAME_VIEW, reverse_sql="DROP VIEW data_personname"),
+        migrations.CreateModel(
+            name='PersonName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'db_table': 'data_personname',
+                'managed': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='alias',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='alias_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(django.db.models.functions.text.Lower('display_name'), name='person_display_name_lower'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0085_match_unique_challonge_match'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='attendee',
+            constraint=models.UniqueConstraint(fields=('sn', 'person'), name='unique_attendee'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0086_attendee_unique_attendee'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='personsnapshot',
+            constraint=models.UniqueConstraint(fields=('person', 'sn'), name='unique_person_snapshot'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0087_personsnapshot_unique_person_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpdateRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('RUN', 'RUNNING'), ('OK', 'SUCCEEDED'), ('ERR', 'FAILED')], default='RUN', max_length=3)),
+                ('stages', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('sn', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data.smashnight')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def rebuild_rivalries(apps, schema_editor):
+    # Rivalries are ranked with the Matchup queryset methods, which historical models don't have
+    from data.models import GameTitle, PersonRivalry
+    for game_title in GameTitle.objects.all():
+        PersonRivalry.objects.rebuild(game_title)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0089_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonRivalry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('R', 'RIVAL'), ('D', 'DEMON')], max_length=1)),
+                ('rank', models.IntegerField()),
+                ('game_title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data.gametitle')),
+                ('opponent', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='data.person')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rivalry_set', to='data.person')),
+            ],
+            options={
+                'ordering': ['kind', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('person', 'game_title', 'kind', 'rank'), name='unique_person_rivalry')],
+            },
+        ),
+        migrations.RunPython(rebuild_rivalries, reverse_code=migrations.RunPython.noop),
+    ]
@@ -1,15 +1,23 @@
 from django.db import models
-from django.db.models import Max, F, Value, Q, Count, Case, When, Min, OuterRef, Subquery, Sum
-from django.db.models.functions import Lower, Concat, Abs, Coalesce, Cast
+from django.db.models import Max, F, Value, Q, Count, Case, When, Min, OuterRef, Subquery, Sum, Exists, Window
+from django.db.models.functions import Lower, Concat, Abs, Coalesce, Cast, RowNumber
 from django.db import transaction
 
 import re
-from challonge import Client
-import os
-from typing import Tuple
+import logging
+import time
+from typing import Tuple, Callable
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 from itertools import groupby, combinations
 
+from .challonge_logic import get_http_client, fetch_bracket_data, CACHE_USE
+from .scoring_logic import (
+    get_score_changes, set_all_score_changes, get_placement_score_change, get_end_score, get_end_score_array,
+)
+
+logger = logging.getLogger(__name__)
+
 # Create your models here.
 class GameTitle(models.Model):
     name = models.CharField(max_length=10, default="SSBU", unique=True)
@@ -69,11 +77,30 @@ class PersonQuerySet(models.QuerySet):
         return self.annotate(
             best_placement_score=Subquery(best_placement_score)
         )
-    
+
+    def set_sn_results(self, sn: 'SmashNight'):
+        """Find each person's attendance, end score, and summed match score changes
+        for the provided SmashNight
+        """
+        attendee = Attendee.objects.filter(sn=sn, person=OuterRef('id'))
+        sn_matches = Match.original_objects.filter(sn=sn)
+        p1_score_changes = sn_matches.filter(p1=OuterRef('id')).values('p1').annotate(
+            total=Sum('p1_score_change')).values('total')
+        p2_score_changes = sn_matches.filter(p2=OuterRef('id')).values('p2').annotate(
+            total=Sum('p2_score_change')).values('total')
+        return self.annotate(
+            is_attendee=Exists(attendee),
+            attendee_end_score=Subquery(attendee.values('end_score')[:1]),
+            p1_score_changes=Coalesce(Subquery(p1_score_changes), Value(0), output_field=models.DecimalField()),
+            p2_score_changes=Coalesce(Subquery(p2_score_changes), Value(0), output_field=models.DecimalField()),
+            played_matches=Exists(sn_matches.filter(Q(p1=OuterRef('id')) | Q(p2=OuterRef('id')))),
+        )
+
     def get_person(self, text):
         """
         Returns the database object corresponding to the given text
         or None if there is no such individual.
+        This is a single query against the indexed :class:`PersonName` view.
 
         Parameters
         ----------
@@ -85,10 +112,55 @@ class PersonQuerySet(models.QuerySet):
         Person or None
             The :class:`Person` object with the given name or alias.
         """
-        for person in self.all():
-            if person.is_name(text):
-                return person
-        return None    
+        matches = list(self.filter(pk__in=PersonName.objects.filter_by_name(text).values('person')))
+        return self.get_single_match(text, matches)
+
+    def resolve_names(self, names) -> dict[str, 'Person']:
+        """
+        Returns the database object for each of the given names, matching
+        display names and aliases case-insensitively. However many names there are,
+        this is one query against the indexed :class:`PersonName` view and one
+        primary key lookup.
+
+        Parameters
+        ----------
+        names : iterable of str, required
+            The names of the people you would like to find.
+
+        Returns
+        -------
+        dict
+            Maps each name to its :class:`Person` object, or None.
+        """
+        names = list(names)
+        person_ids_by_name = defaultdict(set)
+        for lower_name, person_id in (
+            PersonName.objects.annotate(lower_name=Lower('name'))
+            .filter(lower_name__in={name.lower() for name in names})
+            .values_list('lower_name', 'person')
+        ):
+            person_ids_by_name[lower_name].add(person_id)
+        people = self.in_bulk(set().union(*person_ids_by_name.values()))
+        return {
+            name: self.get_single_match(name, [
+                people[person_id] for person_id in person_ids_by_name[name.lower()] if person_id in people
+            ])
+            for name in names
+        }
+
+    @staticmethod
+    def get_single_match(name: str, matches: list['Person']) -> 'Person':
+        """
+        Returns the only person matching a name, or None.
+        A name that belongs to more than one person is ambiguous, so it is
+        logged and resolves to None rather than to an arbitrary person.
+        """
+        if len(matches) > 1:
+            logger.warning(
+                f"'{name}' is a name for more than one person: "
+                f"{', '.join(sorted(person.display_name for person in matches))}"
+            )
+        return matches[0] if len(matches) == 1 else None
 
 class PersonManager(models.Manager.from_queryset(PersonQuerySet)):
 
@@ -139,6 +211,9 @@ class Person(models.Model):
     class Meta:
         verbose_name_plural = "people"
         ordering = [Lower("display_name")]
+        indexes = [
+            models.Index(Lower("display_name"), name="person_display_name_lower"),
+        ]
 
     @property
     def rivals(self):
@@ -279,6 +354,46 @@ class Alias(models.Model):
 
     class Meta:
         verbose_name_plural = "aliases"
+        indexes = [
+            models.Index(Lower("name"), name="alias_name_lower"),
+        ]
+
+
+class PersonNameQuerySet(models.QuerySet):
+    """
+    A class for operations on a set of :class:`PersonName` objects.
+    """
+
+    def filter_by_name(self, name: str) -> models.QuerySet:
+        """
+        Filter to the names matching the given name case-insensitively.
+        Compares Lower(name), so the lookup can use the lowercase name indexes.
+
+        Parameters
+        ----------
+        name: str
+            The display name or alias to find
+        """
+        return self.alias(lower_name=Lower('name')).filter(lower_name=name.lower())
+
+
+class PersonName(models.Model):
+    """
+    Every display name and alias, one row per name. This is a read-only
+    database view over :class:`Person` and :class:`Alias` (see migration 0084),
+    so that name resolution is a single indexed query.
+    """
+    person = models.ForeignKey(Person, on_delete=models.DO_NOTHING, related_name="names")
+    name = models.CharField(max_length=100)
+    objects = PersonNameQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        managed = False
+        db_table = "data_personname"
+
 
 class PreferredCharacter(models.Model):
     person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="main_set")
@@ -438,30 +553,68 @@ class SmashNight(models.Model):
 
     def create_all_attendee_ranks(self):
         """Record all attendee ranks and start scores"""
-        people_with_scores = Person.objects.filter(placement__bracket__in=self.bracket_set.all()).set_best_placement_score(self).distinct().order_by('-score')
-        for rank_by_score, person in enumerate(people_with_scores):
-            start_seed = rank_by_score + 1
-            end_rank = people_with_scores.filter(best_placement_score__lt=person.best_placement_score).distinct().count() + 1
-            Attendee.objects.update_or_create(
+        people_with_scores = list(
+            Person.objects.filter(placement__bracket__in=self.bracket_set.all())
+            .set_best_placement_score(self).distinct().order_by('-score', 'pk')
+        )
+        # An attendee's end rank is one more than the number of attendees with a better placement
+        placement_scores = sorted(
+            person.best_placement_score for person in people_with_scores if person.best_placement_score is not None
+        )
+        attendees = [
+            Attendee(
                 sn=self,
                 person=person,
-                defaults=dict(
-                    start_seed=start_seed,
-                    end_seed=end_rank,
-                    start_score=person.score
-                )
+                start_seed=rank_by_score + 1,
+                end_seed=bisect_left(placement_scores, person.best_placement_score) + 1,
+                start_score=person.score,
             )
+            for rank_by_score, person in enumerate(people_with_scores)
+        ]
+        Attendee.objects.bulk_create(
+            attendees,
+            update_conflicts=True,
+            unique_fields=['sn', 'person'],
+            update_fields=['start_seed', 'end_seed', 'start_score'],
+        )
 
     def update_attendee_scores(self):
         """Update the scores for all attendees at this event"""
-        for attendee in self.attendee_set.all():
-            attendee.update_end_score()
+        match_score_changes = Match.original_objects.filter(sn=self)
+        p1_score_changes = match_score_changes.filter(p1=OuterRef('person')).values('p1').annotate(
+            total=Sum('p1_score_change')).values('total')
+        p2_score_changes = match_score_changes.filter(p2=OuterRef('person')).values('p2').annotate(
+            total=Sum('p2_score_change')).values('total')
+        attendees = list(
+            self.attendee_set.filter(person__isnull=False).select_related('person').annotate(
+                p1_score_changes=Coalesce(Subquery(p1_score_changes), Value(0), output_field=models.DecimalField()),
+                p2_score_changes=Coalesce(Subquery(p2_score_changes), Value(0), output_field=models.DecimalField()),
+            )
+        )
+        if not attendees:
+            return
+        end_scores = get_end_score_array(
+            # sum as Decimals first, as update_end_score does
+            [float(a.start_score + a.p1_score_changes + a.p2_score_changes) for a in attendees],
+            [a.person.status == Person.ELITE for a in attendees],
+            [a.start_seed for a in attendees],
+            [a.end_seed for a in attendees],
+            self.attendee_set.count(),
+        )
+        for attendee, end_score in zip(attendees, end_scores.tolist()):
+            attendee.end_score = end_score
+        Attendee.objects.bulk_update(attendees, ['end_score'], batch_size=1000)
         return
     
     def update_all_challenge_matches(self):
-        for c_match in self.match_set.filter(type=Match.CHALLENGE):
-            c_match.set_initial_scores()
-            c_match.set_score_changes()
+        challenge_matches = list(self.match_set.filter(type=Match.CHALLENGE).select_related('p1', 'p2'))
+        for c_match in challenge_matches:
+            c_match.p1_score = c_match.p1.score
+            c_match.p2_score = c_match.p2.score
+        set_all_score_changes(challenge_matches)
+        Match.original_objects.bulk_update(
+            challenge_matches, ['p1_score', 'p2_score', 'p1_score_change', 'p2_score_change'], batch_size=1000
+        )
         return
 
 
@@ -484,56 +637,76 @@ class Bracket(models.Model):
         sn_shorthand = self.sn.shorthand() if self.sn else "<No SN found>"
         return f"{sn_shorthand}: {self.title}"
 
-    def get_challonge_bracket_data(self) -> Tuple[list, list]:
-        # Set up credentials to access challonge account
-        with Client(user=os.environ.get('CHALLONGE_USER'), api_key=os.environ.get('CHALLONGE_KEY')) as challonge_client:
-            # get the challonge tournament
-            tournament = challonge_client.tournaments.show(self.url.replace("https://challonge.com/", ""))
-            # get all participants from challonge
-            participants = challonge_client.participants.index(tournament.id)
-            # get all matches from challonge
-            matches = challonge_client.matches.index(tournament.id)
-
-            return participants, matches
+    def get_challonge_bracket_data(self, cache_mode: str = CACHE_USE) -> Tuple[list, list]:
+        with get_http_client() as http_client:
+            return fetch_bracket_data(self.url, http_client, cache_mode)
 
+    def create_matches(self, bracket_data: Tuple[list, list] = None):
+        """
+        Create or update the matches of this bracket from its Challonge data
 
-    def create_matches(self):
-        participants, matches = self.get_challonge_bracket_data()
+        Parameters
+        ----------
+        bracket_data: tuple
+            The (participants, matches) already fetched from Challonge.
+            If not provided, they are fetched now.
+        """
+        participants, matches = bracket_data or self.get_challonge_bracket_data()
         participant_ids = {}
-        people = Person.objects
+        people_by_name = Person.objects.resolve_names(participant.name for participant in participants)
         # add all participants to id list
         for participant in participants:
-            sncrs_person = people.get_person(participant.name)
+            sncrs_person = people_by_name[participant.name]
             if sncrs_person is not None:
                 participant_ids[participant.id] = sncrs_person
 
+        # if there is a score and two valid participants, add an element
+        match_rows = []
         for match in matches:
-            # if there is a score and two valid participants, add an element
             scores_csv = match.scores_csv
             player1 = participant_ids.get(match.player1_id or "invalid_player_id")
             player2 = participant_ids.get(match.player2_id or "invalid_player_id")
             if scores_csv and player1 and player2:
                 scores = re.split(r'(?<=\d)-(?=\d)|(?<=\d)-(?=-)', scores_csv)
-                sc1 = scores[0]
-                sc2 = scores[1]
-                match_id = match.id
-                match_object, created = Match.original_objects.update_or_create(
-                    challonge_id=match_id,
-                    p1=player1,
-                    p2=player2,
-                    defaults=dict(
-                        p1_wins=sc1,
-                        p2_wins=sc2,
-                        type=Match.BRACKET,
-                        round=match.round,
-                        sn=self.sn,
-                        bracket=self,
-                        game_title = self.game_title
-                    )
-                )
-                if created:
-                    match_object.set_initial_scores()
-                match_object.set_score_changes()
+                match_rows.append((match, player1, player2, int(scores[0]), int(scores[1])))
+        if not match_rows:
+            return
+
+        # Matches that already exist keep the initial scores they were created with
+        existing_scores = {
+            (challonge_id, p1_id, p2_id): (p1_score, p2_score)
+            for challonge_id, p1_id, p2_id, p1_score, p2_score in Match.original_objects.filter(
+                challonge_id__in={match.id for match, *_ in match_rows}
+            ).values_list('challonge_id', 'p1', 'p2', 'p1_score', 'p2_score')
+        }
+        match_objects = []
+        for match, player1, player2, p1_wins, p2_wins in match_rows:
+            p1_score, p2_score = existing_scores.get((match.id, player1.pk, player2.pk), (None, None))
+            match_objects.append(Match(
+                challonge_id=match.id,
+                p1=player1,
+                p2=player2,
+                p1_score=player1.score if p1_score is None else p1_score,
+                p2_score=player2.score if p2_score is None else p2_score,
+                p1_wins=p1_wins,
+                p2_wins=p2_wins,
+                type=Match.BRACKET,
+                round=match.round,
+                sn=self.sn,
+                bracket=self,
+                game_title=self.game_title,
+            ))
+        set_all_score_changes(match_objects)
+        with transaction.atomic():
+            Match.original_objects.bulk_create(
+                match_objects,
+                update_conflicts=True,
+                unique_fields=['challonge_id', 'p1', 'p2'],
+                update_fields=[
+                    'p1_score', 'p2_score', 'p1_wins', 'p2_wins', 'p1_score_change', 'p2_score_change',
+                    'type', 'round', 'sn', 'bracket', 'game_title',
+                ],
+            )
 
     def get_starting_ranks(self) -> dict[int, int]:
         """Get the initial rank for each participant"""
@@ -873,6 +1046,36 @@ class MatchQuerySet(models.QuerySet):
             aggregated_vals['py_wins'],
         )
 
+    def get_pair_wins(self) -> dict[tuple[int, int], list[int]]:
+        """
+        Return the game and set wins for every pair of people with matches in this set,
+        computed with a single query grouped by (p1, p2).
+        Should only be used on a set without aggregate annotations, i.e. Match.original_objects
+
+        Returns
+        -------
+        dict
+            Maps (px_id, py_id) to [px_game_wins, py_game_wins, px_set_wins, py_set_wins].
+            Every pair is included in both orders.
+        """
+        grouped_wins = self.filter(
+            p1__isnull=False, p2__isnull=False
+        ).exclude(
+            p1=F('p2')
+        ).order_by().values('p1', 'p2').annotate(
+            p1_game_wins=Sum('p1_wins'),
+            p2_game_wins=Sum('p2_wins'),
+            p1_set_wins=Count('pk', filter=Q(p1_wins__gt=F('p2_wins'))),
+            p2_set_wins=Count('pk', filter=Q(p2_wins__gt=F('p1_wins'))),
+        )
+        pair_wins = defaultdict(lambda: [0, 0, 0, 0])
+        for row in grouped_wins:
+            p1_wins = (row['p1_game_wins'], row['p2_game_wins'], row['p1_set_wins'], row['p2_set_wins'])
+            p2_wins = (row['p2_game_wins'], row['p1_game_wins'], row['p2_set_wins'], row['p1_set_wins'])
+            for pair, wins in (((row['p1'], row['p2']), p1_wins), ((row['p2'], row['p1']), p2_wins)):
+                pair_wins[pair] = [total + new for total, new in zip(pair_wins[pair], wins)]
+        return dict(pair_wins)
+
     def set_winner_and_loser_annotation(self) -> models.QuerySet:
         """
         Annotate matchups with the id of the winner and loser
@@ -954,7 +1157,7 @@ class Match(models.Model):
     match_url = models.URLField(max_length=200, null=True, blank=True)
     round = models.IntegerField(null=True, blank=True)
     objects = MatchManager()
-    original_objects = models.Manager()
+    original_objects = MatchQuerySet.as_manager()
 
     BRACKET = 0
     CHALLENGE = 1
@@ -978,20 +1181,17 @@ class Match(models.Model):
 
     class Meta:
         verbose_name_plural = "matches"
+        constraints = [
+            models.UniqueConstraint(fields=["challonge_id", "p1", "p2"], name="unique_challonge_match"),
+        ]
     
     def set_score_changes(self):
         """
         Set the changes in score according to the player scores and match results.
         """
-        if int(self.p1_wins) == -1 or int(self.p2_wins) == -1:
-            self.p1_score_change = 0
-            self.p2_score_change = 0
-        elif self.p1_wins > self.p2_wins:
-            self.p1_score_change = 5 * (1 - 1 / (1 + 5.0 ** ((float(self.p2_score) - float(self.p1_score)) / 80)))
-            self.p2_score_change = -3 * (1 / (1 + 10.0 ** ((float(self.p1_score) - float(self.p2_score)) / 80)))
-        else:
-            self.p1_score_change = -3 * (1 / (1 + 10.0 ** ((float(self.p2_score) - float(self.p1_score)) / 80)))
-            self.p2_score_change = 5 * (1 - 1 / (1 + 5.0 ** ((float(self.p1_score) - float(self.p2_score)) / 80)))
+        self.p1_score_change, self.p2_score_change = get_score_changes(
+            self.p1_score, self.p2_score, int(self.p1_wins), int(self.p2_wins)
+        )
         self.save()
 
     def set_initial_scores(self):
@@ -1013,13 +1213,15 @@ class Attendee(models.Model):
 
     class Meta:
         ordering = ['sn__date']
+        constraints = [
+            models.UniqueConstraint(fields=["sn", "person"], name="unique_attendee"),
+        ]
 
     def get_placement_score_change(self):
         """Get the score change based on overall placement"""
-        points = 5.0 if self.person.status == Person.ELITE else 0.0
-        if self.start_seed >= self.end_seed:
-            points += (self.start_seed - self.end_seed + 0.5) * 30 / self.sn.attendee_set.count() + 3
-        return points
+        return get_placement_score_change(
+            self.person.status == Person.ELITE, self.start_seed, self.end_seed, self.sn.attendee_set.count()
+        )
 
     def update_end_score(self):
         """Update the final score based on the starting score,
@@ -1035,8 +1237,7 @@ class Attendee(models.Model):
         for match in p2_matches:
             current_score += match.p2_score_change
         # add placement score changes
-        current_score = float(current_score) + self.get_placement_score_change()
-        self.end_score = max(current_score, 60.0)
+        self.end_score = get_end_score(float(current_score), self.get_placement_score_change())
         self.save()
 
 
@@ -1084,6 +1285,28 @@ class MatchupTypeQuerySet(models.QuerySet):
         """
         return self.get(lower_bound__lte=win_percent, upper_bound__gt=win_percent)
 
+    def get_type_lookup(self) -> Callable[[float], 'MatchupType']:
+        """
+        Load every MatchupType once and return a function that finds the MatchupType
+        for a win percent in memory, with the same bounds as get_type_by_percent
+
+        Returns
+        -------
+        function
+            Takes a win percent and returns the matching MatchupType, or None if no
+            band contains it
+        """
+        matchup_types = list(self.order_by('lower_bound'))
+        lower_bounds = [matchup_type.lower_bound for matchup_type in matchup_types]
+
+        def get_type(win_percent: float):
+            index = bisect_right(lower_bounds, win_percent) - 1
+            if index >= 0 and win_percent < matchup_types[index].upper_bound:
+                return matchup_types[index]
+            return None
+
+        return get_type
+
 class MatchupType(models.Model):
     name = models.CharField(max_length=100, null=True, blank=True)
     lower_bound = models.DecimalField(max_digits=10, decimal_places=2)
@@ -1111,6 +1334,9 @@ class PersonSnapshot(models.Model):
 
     class Meta:
         ordering = ["sn__date", "person__team", "person__display_name"]
+        constraints = [
+            models.UniqueConstraint(fields=["person", "sn"], name="unique_person_snapshot"),
+        ]
 
 
 class MatchupQuerySet(models.QuerySet):
@@ -1294,20 +1520,91 @@ class MatchupQuerySet(models.QuerySet):
         )
         return annotated
 
+    def filter_top_per_player(self, score: str, count: int) -> models.QuerySet:
+        """
+        Keep only each person x's top matchups in each game, using a window function
+        so that every person is ranked in the same query
+
+        Parameters
+        ----------
+        score: str
+            The annotation to rank matchups by, highest first, such as rival_score or demon_score
+        count: int
+            The number of matchups to keep for each person x and game title
+
+        Returns
+        -------
+        models.QuerySet
+            The top matchups, annotated with their score_rank starting at 1
+        """
+        annotated = self.annotate(
+            score_rank=Window(
+                RowNumber(),
+                partition_by=[F('px'), F('game_title')],
+                order_by=[F(score).desc(), F('py__display_name').asc()],
+            )
+        )
+        return annotated.filter(score_rank__lte=count)
+
     def set_matchup_types(self):
         """
         Set the game and set matchup type for each matchup
+
+        The MatchupType bands are loaded once and matched in memory. Matchups whose types
+        changed are then saved with one UPDATE per combination of game and set type.
+        """
+        get_type = MatchupType.objects.get_type_lookup()
+        changed_ids_by_types = defaultdict(list)
+        matchup_values = self.values_list(
+            'pk', 'game_win_percent', 'set_win_percent', 'matchup_type', 'set_matchup_type'
+        )
+        for pk, game_win_percent, set_win_percent, matchup_type_id, set_matchup_type_id in matchup_values:
+            matchup_type = get_type(game_win_percent)
+            set_matchup_type = get_type(set_win_percent)
+            if (
+                getattr(matchup_type, 'pk', None) != matchup_type_id
+                or getattr(set_matchup_type, 'pk', None) != set_matchup_type_id
+            ):
+                changed_ids_by_types[(matchup_type, set_matchup_type)].append(pk)
+        for (matchup_type, set_matchup_type), matchup_ids in changed_ids_by_types.items():
+            for start in range(0, len(matchup_ids), 1000):
+                self.model.objects.filter(pk__in=matchup_ids[start:start + 1000]).update(
+                    matchup_type=matchup_type,
+                    set_matchup_type=set_matchup_type,
+                )
+
+    def get_expected_pair_wins(self, game_title: 'GameTitle', person_ids) -> dict[tuple[int, int], list[int]]:
         """
-        for matchup in self:
-            matchup.matchup_type = MatchupType.objects.get_type_by_percent(matchup.game_win_percent)
-            matchup.set_matchup_type = MatchupType.objects.get_type_by_percent(matchup.set_win_percent)
-            matchup.save()
+        Count the game and set wins between the given people from all of their matches.
+        Matches that were a forfeit (someone has a negative score) are not used.
+
+        Parameters
+        ----------
+        game_title: GameTitle
+            The game title to count wins for
+        person_ids: iterable or models.QuerySet
+            The ids of the people whose matches should be counted
+
+        Returns
+        -------
+        dict
+            Maps (px_id, py_id) to [px_game_wins, py_game_wins, px_set_wins, py_set_wins]
+            for every pair that played a counted match
+        """
+        match_queryset = Match.original_objects.filter(
+            p1_wins__gte=0, p2_wins__gte=0, game_title=game_title,
+            p1__in=person_ids, p2__in=person_ids,
+        )
+        return match_queryset.get_pair_wins()
 
     def create_or_update_matchups_table(self, game_title: 'GameTitle', person_list: models.QuerySet = None) -> None:
         """
         Create or update the full matchups table with the given person_list
         During this process, do not overwrite additional_wins, as that is a manually entered value
 
+        All pair totals come from one grouped query over Match, and are written
+        with a single bulk upsert rather than per pair.
+
         Parameters
         ----------
         game_title: GameTitle
@@ -1315,36 +1612,132 @@ class MatchupQuerySet(models.QuerySet):
         person_list: models.QuerySet
             The list of people to generate the matchup table for. If not provided, defaults to all people
         """
+        start_time = time.perf_counter()
         person_list = person_list or Person.objects.all()
-        # Don't use matches that were a forfeit (someone has a negative score)
-        match_queryset = Match.objects.filter(p1_wins__gte=0, p2_wins__gte=0, game_title=game_title)
-        for person_x, person_y in combinations(person_list, 2):
-            px_wins, py_wins = match_queryset.get_player_game_wins(person_x, person_y)
-            px_set_wins, py_set_wins = match_queryset.get_player_set_wins(person_x, person_y)
-            self.update_or_create(
-                px=person_x,
-                py=person_y,
-                game_title=game_title,
-                defaults=dict(
-                    px_wins=px_wins,
-                    py_wins=py_wins,
-                    px_set_wins=px_set_wins,
-                    py_set_wins=py_set_wins,
-                )
-            )
-            self.update_or_create(
-                py=person_x,
-                px=person_y,
-                game_title=game_title,
-                defaults=dict(
-                    py_wins=px_wins,
-                    px_wins=py_wins,
-                    py_set_wins=px_set_wins,
-                    px_set_wins=py_set_wins,
-                )
-            )
+        person_ids = list(person_list.values_list('pk', flat=True))
+        pair_wins = self.get_expected_pair_wins(game_title, person_list.values('pk'))
+        # Pairs that never played still get a matchup, with no game wins and no set wins
+        matchups = [
+            Matchup(px_id=px_id, py_id=py_id, game_title=game_title)
+            for person_x, person_y in combinations(person_ids, 2)
+            for px_id, py_id in ((person_x, person_y), (person_y, person_x))
+        ]
+        for matchup in matchups:
+            (
+                matchup.px_wins,
+                matchup.py_wins,
+                matchup.px_set_wins,
+                matchup.py_set_wins,
+            ) = pair_wins.get((matchup.px_id, matchup.py_id), Matchup.NO_WINS)
+        self.bulk_upsert_wins(matchups)
+        logger.info(
+            f"Rebuilt {len(matchups)} matchups for {game_title} from {len(pair_wins)} played pairings "
+            f"in {time.perf_counter() - start_time:.2f}s"
+        )
         self.filter(game_title=game_title).set_matchup_types()
 
+    def update_matchups_for_sn(self, sn: 'SmashNight', game_title: 'GameTitle') -> set[int]:
+        """
+        Update only the matchups between people who played each other at the given SmashNight.
+        The totals for those pairs are recounted from all of their matches, rather than adding
+        the night's results on top, so running this again for the same night gives the same result.
+        During this process, do not overwrite additional_wins, as that is a manually entered value
+
+        Parameters
+        ----------
+        sn: SmashNight
+            The SmashNight whose matches should be applied
+        game_title: GameTitle
+            The game title to update matchups for
+
+        Returns
+        -------
+        set[int]
+            The ids of the people whose matchups were updated
+        """
+        start_time = time.perf_counter()
+        sn_pairs = set()
+        sn_matches = Match.original_objects.filter(
+            sn=sn, game_title=game_title, p1__isnull=False, p2__isnull=False
+        ).exclude(p1=F('p2'))
+        for p1_id, p2_id in sn_matches.values_list('p1', 'p2').distinct():
+            sn_pairs.update(((p1_id, p2_id), (p2_id, p1_id)))
+        if not sn_pairs:
+            return set()
+        person_ids = {person_id for pair in sn_pairs for person_id in pair}
+        pair_wins = self.get_expected_pair_wins(game_title, person_ids)
+        matchups = []
+        for px_id, py_id in sn_pairs:
+            matchup = Matchup(px_id=px_id, py_id=py_id, game_title=game_title)
+            (
+                matchup.px_wins,
+                matchup.py_wins,
+                matchup.px_set_wins,
+                matchup.py_set_wins,
+            ) = pair_wins.get((px_id, py_id), Matchup.NO_WINS)
+            matchups.append(matchup)
+        self.bulk_upsert_wins(matchups)
+        logger.info(
+            f"Updated {len(matchups)} matchups for {game_title} at {sn} "
+            f"in {time.perf_counter() - start_time:.2f}s"
+        )
+        self.filter(game_title=game_title, px__in=person_ids, py__in=person_ids).set_matchup_types()
+        return person_ids
+
+    def get_rebuild_differences(self, game_title: 'GameTitle') -> list[tuple[tuple[int, int], tuple, tuple]]:
+        """
+        Compare the stored matchup wins with a full recount from every match, without writing anything.
+        Used to verify that incremental updates have kept the table correct.
+
+        Parameters
+        ----------
+        game_title: GameTitle
+            The game title to verify matchups for
+
+        Returns
+        -------
+        list
+            (px_id, py_id), stored wins, expected wins for every pair that does not agree.
+            A missing game win count is treated as 0.
+        """
+        normalize = lambda wins: tuple(win or 0 for win in wins)
+        expected_wins = {
+            pair: normalize(wins)
+            for pair, wins in self.get_expected_pair_wins(game_title, Person.objects.values('pk')).items()
+        }
+        stored_wins = {
+            (px_id, py_id): normalize(wins)
+            for px_id, py_id, *wins in self.filter(
+                game_title=game_title, px__isnull=False, py__isnull=False
+            ).values_list('px', 'py', 'px_wins', 'py_wins', 'px_set_wins', 'py_set_wins')
+        }
+        no_wins = normalize(Matchup.NO_WINS)
+        differences = []
+        for pair in expected_wins.keys() | stored_wins.keys():
+            stored = stored_wins.get(pair, no_wins)
+            expected = expected_wins.get(pair, no_wins)
+            if stored != expected:
+                differences.append((pair, stored, expected))
+        return differences
+
+    def bulk_upsert_wins(self, matchups: list['Matchup']) -> None:
+        """
+        Insert the given matchups, or update the win columns of the ones that already exist.
+        The additional_wins columns are manually entered values, so they are never overwritten.
+
+        Parameters
+        ----------
+        matchups: list[Matchup]
+            Unsaved matchups with px, py, game_title and the win columns set
+        """
+        self.bulk_create(
+            matchups,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['px', 'py', 'game_title'],
+            update_fields=['px_wins', 'py_wins', 'px_set_wins', 'py_set_wins'],
+        )
+
 class MatchupManager(models.Manager.from_queryset(MatchupQuerySet)):
 
     def get_queryset(self):
@@ -1375,6 +1768,10 @@ class Matchup(models.Model):
         related_name='set_matchup_set'
     )
     objects = MatchupManager()
+    original_objects = MatchupQuerySet.as_manager()
+
+    # px_wins, py_wins, px_set_wins, py_set_wins for a pair without any counted matches
+    NO_WINS = (None, None, 0, 0)
 
     def __str__(self):
         return "{} vs. {} in {}".format(self.px, self.py, self.game_title)
@@ -1396,6 +1793,77 @@ class Matchup(models.Model):
         return self.px_wins + self.px_additional_wins, self.py_wins + self.py_additional_wins
 
 
+class PersonRivalryQuerySet(models.QuerySet):
+    """
+    A class for operations on a set of :class:`PersonRivalry` objects.
+    """
+
+    def rebuild(self, game_title: GameTitle, person_ids=None) -> None:
+        """
+        Rebuild the top rivals and demons in a game from the matchups table.
+        A person's rivals and demons only depend on their own matchups, so only the
+        people whose matchups changed need to be rebuilt.
+
+        Parameters
+        ----------
+        game_title: GameTitle
+            The game title to rebuild rivalries for
+        person_ids: set[int]
+            The people to rebuild rivalries for. If not provided, defaults to everyone.
+        """
+        start_time = time.perf_counter()
+        matchups = Matchup.original_objects.filter(game_title=game_title)
+        existing = self.filter(game_title=game_title)
+        if person_ids is not None:
+            matchups = matchups.filter(px__in=person_ids)
+            existing = existing.filter(person__in=person_ids)
+        matchups = matchups.filter(px__isnull=False).set_rival_score_annotation().set_demon_score_annotation()
+
+        rivalries = []
+        for kind, score in ((PersonRivalry.Kind.RIVAL, 'rival_score'), (PersonRivalry.Kind.DEMON, 'demon_score')):
+            rivalries.extend(
+                PersonRivalry(person_id=px_id, game_title=game_title, kind=kind, rank=rank, opponent_id=py_id)
+                for px_id, py_id, rank in matchups.filter_top_per_player(score, PersonRivalry.TOP_COUNTS[kind])
+                .values_list('px', 'py', 'score_rank')
+            )
+        with transaction.atomic():
+            existing.delete()
+            self.bulk_create(rivalries, batch_size=1000)
+        logger.info(
+            f"Rebuilt {len(rivalries)} rivalries for {game_title} in {time.perf_counter() - start_time:.2f}s"
+        )
+
+
+class PersonRivalry(models.Model):
+    """
+    One of a person's top rivals or demons in a game, precomputed from the matchups table
+    so that pages don't have to rank every matchup when they are shown
+    """
+
+    class Kind(models.TextChoices):
+        RIVAL = "R", "RIVAL"
+        DEMON = "D", "DEMON"
+
+    # How many of each kind are kept for each person and game
+    TOP_COUNTS = {Kind.RIVAL: 2, Kind.DEMON: 1}
+
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="rivalry_set")
+    game_title = models.ForeignKey(GameTitle, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=1, choices=Kind)
+    rank = models.IntegerField()
+    opponent = models.ForeignKey(Person, on_delete=models.SET_NULL, null=True, related_name="+")
+    objects = PersonRivalryQuerySet.as_manager()
+
+    def __str__(self):
+        return "{} {} {} of {} in {}".format(self.get_kind_display(), self.rank, self.opponent, self.person, self.game_title)
+
+    class Meta:
+        ordering = ["kind", "rank"]
+        constraints = [
+            models.UniqueConstraint(fields=["person", "game_title", "kind", "rank"], name="unique_person_rivalry"),
+        ]
+
+
 class Venue(models.Model):
     name = models.CharField(max_length=255)
     bio = models.TextField()
@@ -1415,9 +1883,9 @@ class Greeting(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.pk:
-            person_to_assign = Person.objects.filter(Q(display_name__iexact=self.name) | Q(alias__name__iexact=self.name)).distinct()
-            if len(person_to_assign) == 1:
-                self.person = person_to_assign[0]
+            person_to_assign = Person.objects.get_person(self.name)
+            if person_to_assign is not None:
+                self.person = person_to_assign
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -1495,4 +1963,71 @@ class TwitchToken(models.Model):
     nickname = models.CharField(max_length=40, default="Unknown User")
 
     def __str__(self):
-        return self.nickname
\ No newline at end of file
+        return self.nickname
+
+class UpdateRun(models.Model):
+    """A record of one full update of a SmashNight, with the time spent in each stage"""
+
+    class Status(models.TextChoices):
+        RUNNING = "RUN", "RUNNING"
+        SUCCEEDED = "OK", "SUCCEEDED"
+        FAILED = "ERR", "FAILED"
+
+    sn = models.ForeignKey(SmashNight, on_delete=models.CASCADE)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=3, choices=Status, default=Status.RUNNING)
+    # One entry per finished stage: name, seconds, queries and rows written
+    stages = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return "{} update at {}: {}".format(self.sn, self.started_at, self.get_status_display())
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def stage_summary(self) -> str:
+        """Describe the time, queries, and rows written for each stage"""
+        return ", ".join(
+            "{}: {:.2f}s, {} queries, {} rows".format(stage["name"], stage["seconds"], stage["queries"], stage["rows"])
+            for stage in self.stages
+        )
+
+
+class Job(models.Model):
+    """
+    A queued admin action, run in the background by the run_jobs worker
+    so that long updates do not tie up a web worker.
+    """
+
+    class Kind(models.TextChoices):
+        FULL_UPDATE = "FULL", "FULL_UPDATE"
+        YOUTUBE_VIDEOS = "YT", "YOUTUBE_VIDEOS"
+
+    class Status(models.TextChoices):
+        QUEUED = "QUE", "QUEUED"
+        RUNNING = "RUN", "RUNNING"
+        SUCCEEDED = "OK", "SUCCEEDED"
+        FAILED = "ERR", "FAILED"
+
+    kind = models.CharField(max_length=4, choices=Kind)
+    sn = models.ForeignKey(SmashNight, on_delete=models.CASCADE)
+    # Keyword arguments for the action, such as verify and cache_mode for a full update
+    options = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=3, choices=Status, default=Status.QUEUED)
+    progress = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    update_run = models.ForeignKey(UpdateRun, on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return "{} for {}: {}".format(self.get_kind_display(), self.sn, self.get_status_display())
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="job_queue"),
+        ]
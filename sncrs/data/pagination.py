@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Page through a list by primary key, so every page is an index range scan
+    however deep it is, and rows added while paging don't shift the pages.
+    Use ?page_size= to ask for bigger pages, or the ndjson format to stream everything.
+    Set as the pagination_class of the lists that are too long to send at once;
+    the other lists are sent whole, as before.
+    """
+    ordering = 'pk'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,66 @@
+# profile_logic.py
+
+# Player profiles
+# The players page shows each member's medals, mains, rivals and demons in every game.
+# The profiles are assembled from one query per kind of data for all members at once,
+# so the number of queries doesn't grow with the number of players.
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .models import Medal, PersonRivalry, PreferredCharacter
+
+
+@dataclass
+class PlayerProfile:
+    """A member's medals, mains, rivals and demons in one game"""
+    medal: Optional[Medal] = None
+    mains: list = field(default_factory=list)
+    rivals: list = field(default_factory=list)
+    demons: list = field(default_factory=list)
+
+
+def get_player_profiles(people, game_titles, main_count: int = 3) -> list:
+    """
+    Get every member's profile in every game
+
+    Parameters
+    ----------
+    people: list[Person]
+        The members to include, in display order
+    game_titles: list[GameTitle]
+        The games to include, in display order
+    main_count: int
+        The most mains to keep per profile
+
+    Returns
+    -------
+    list
+        A (game title, rows) pair for each game, where each row is a (person, PlayerProfile) pair
+    """
+    profiles = defaultdict(PlayerProfile)
+    for medal in Medal.objects.filter(person__in=people, game_title__in=game_titles):
+        profiles[(medal.person_id, medal.game_title_id)].medal = medal
+    for main in (
+        PreferredCharacter.objects.filter(person__in=people, character__game_title__in=game_titles)
+        .select_related('character').order_by('order', 'pk')
+    ):
+        mains = profiles[(main.person_id, main.character.game_title_id)].mains
+        if len(mains) < main_count:
+            mains.append(main)
+    # The top rivals and demons are precomputed, in rank order
+    for person_id, game_title_id, kind, opponent_name in (
+        PersonRivalry.objects.filter(person__in=people, game_title__in=game_titles)
+        .values_list('person', 'game_title', 'kind', 'opponent__display_name')
+    ):
+        profile = profiles[(person_id, game_title_id)]
+        if kind == PersonRivalry.Kind.RIVAL:
+            profile.rivals.append(opponent_name)
+        else:
+            profile.demons.append(opponent_name)
+
+    return [
+        (game_title, [(person, profiles[(person.pk, game_title.pk)]) for person in people])
+        for game_title in game_titles
+    ]
@@ -0,0 +1,25 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON, one object per line.
+    List views stream their rows in this format themselves, so this only renders
+    responses that aren't lists, such as errors, as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return render_line(data)
+
+
+def render_line(data) -> bytes:
+    """Render one object as a line of JSON"""
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False).encode('utf-8') + b'\n'
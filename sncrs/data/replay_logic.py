@@ -0,0 +1,379 @@
+# replay_logic.py
+
+# Season replay
+# Load every match, placement, attendee and snapshot of a season once,
+# then replay the scoring rules night by night in memory, in the same order
+# full_update applies them:
+#   start snapshot (members carry over the previous night's end score),
+#   match score changes (bracket matches keep the scores they were created with,
+#   as in Bracket.create_matches), attendee ranks, attendee end scores,
+#   score propagation, end snapshot.
+# The results can be compared with the database or written back in bulk.
+# Seeds, matchups and medals do not affect scores and are not replayed.
+
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from decimal import Context, Decimal, ROUND_HALF_UP
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Max
+
+from .cache_logic import bump_data_version_on_commit
+from .models import Attendee, Match, Person, PersonSnapshot, Placement, SmashNight
+from .scoring_logic import (
+    ScoringParameters, DEFAULT_SCORING,
+    get_competition_ranks, get_end_score_array, get_score_change_arrays,
+)
+
+SCORE_CONTEXT = Context(prec=20)
+CENT = Decimal("0.01")
+
+
+def to_stored_score(value) -> Decimal:
+    """Round a score the way a 2 decimal place score column stores it"""
+    if isinstance(value, float):
+        value = SCORE_CONTEXT.create_decimal_from_float(value)
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+@dataclass
+class ReplayMatch:
+    pk: int
+    sn_id: int
+    type: int
+    challonge_id: Optional[int]
+    p1_id: Optional[int]
+    p2_id: Optional[int]
+    p1_wins: Optional[int]
+    p2_wins: Optional[int]
+    p1_score: Optional[Decimal]
+    p2_score: Optional[Decimal]
+    p1_score_change: Optional[Decimal]
+    p2_score_change: Optional[Decimal]
+
+    @property
+    def is_scored(self) -> bool:
+        """Whether full_update sets this match's scores, rather than them being entered by hand"""
+        is_challonge_match = self.type == Match.BRACKET and self.challonge_id is not None
+        return (
+            (is_challonge_match or self.type == Match.CHALLENGE)
+            and self.p1_id is not None and self.p2_id is not None
+        )
+
+
+@dataclass
+class ReplayAttendee:
+    pk: Optional[int]
+    sn_id: int
+    person_id: Optional[int]
+    start_seed: Optional[int]
+    end_seed: Optional[int]
+    start_score: Optional[Decimal]
+    end_score: Optional[Decimal]
+
+
+@dataclass
+class SeasonData:
+    """Everything needed to replay a season, loaded with one query per table"""
+    season: int
+    sns: list
+    # Person pk to score, whether they are a member, and whether they are elite
+    scores: dict
+    members: set
+    elites: set
+    matches: dict = field(default_factory=lambda: defaultdict(list))
+    attendees: dict = field(default_factory=lambda: defaultdict(list))
+    # SmashNight pk to each person's best placement score
+    best_placements: dict = field(default_factory=lambda: defaultdict(dict))
+    # (person pk, SmashNight pk) to [start_rank, start_score, end_rank, end_score]
+    snapshots: dict = field(default_factory=dict)
+
+
+@dataclass
+class ReplayResult:
+    season: int
+    matches: list = field(default_factory=list)
+    attendees: list = field(default_factory=list)
+    snapshots: dict = field(default_factory=dict)
+    # Everyone's scores and member ranks after the last night
+    scores: dict = field(default_factory=dict)
+    ranks: dict = field(default_factory=dict)
+    # SmashNight pk to each member's end score, in night order
+    score_history: dict = field(default_factory=dict)
+
+
+def load_season(season: int) -> SeasonData:
+    """Load every row of a season needed for a replay"""
+    sns = list(SmashNight.objects.filter(season=season).order_by('date', 'night_count', 'pk'))
+    people = Person.objects.values_list('pk', 'score', 'tag', 'status')
+    data = SeasonData(
+        season=season,
+        sns=sns,
+        scores={pk: score for pk, score, _, _ in people},
+        members={pk for pk, _, tag, _ in people if tag == Person.MEMBER},
+        elites={pk for pk, _, _, status in people if status == Person.ELITE},
+    )
+    match_fields = [
+        'pk', 'sn_id', 'type', 'challonge_id', 'p1_id', 'p2_id', 'p1_wins', 'p2_wins',
+        'p1_score', 'p2_score', 'p1_score_change', 'p2_score_change',
+    ]
+    for values in Match.original_objects.filter(sn__in=sns).order_by('pk').values_list(*match_fields):
+        match = ReplayMatch(*values)
+        data.matches[match.sn_id].append(match)
+    attendee_fields = ['pk', 'sn_id', 'person_id', 'start_seed', 'end_seed', 'start_score', 'end_score']
+    for values in Attendee.objects.filter(sn__in=sns).order_by('pk').values_list(*attendee_fields):
+        attendee = ReplayAttendee(*values)
+        data.attendees[attendee.sn_id].append(attendee)
+    # An attendee's best placement is their placement in the highest ranked bracket
+    placements = Placement.objects.filter(bracket__sn__in=sns, person__isnull=False).order_by(
+        'bracket__rank', 'pk').values_list('bracket__sn', 'person', 'placement_score')
+    for sn_id, person_id, placement_score in placements:
+        data.best_placements[sn_id].setdefault(person_id, placement_score)
+    snapshots = PersonSnapshot.objects.filter(sn__in=sns).values_list(
+        'person', 'sn', 'start_rank', 'start_score', 'end_rank', 'end_score')
+    for person_id, sn_id, *values in snapshots:
+        data.snapshots[(person_id, sn_id)] = values
+    return data
+
+
+def get_starting_scores(data: SeasonData) -> dict:
+    """
+    Get everyone's score going into the season. This is the score stored at their
+    first appearance in the season, or their current score if they never appeared.
+    """
+    scores = dict(data.scores)
+    seen = set()
+    for sn in data.sns:
+        first_seen = {}
+        for match in data.matches[sn.pk]:
+            first_seen.setdefault(match.p1_id, match.p1_score)
+            first_seen.setdefault(match.p2_id, match.p2_score)
+        for attendee in data.attendees[sn.pk]:
+            first_seen[attendee.person_id] = attendee.start_score
+        for (person_id, sn_id), (_, start_score, _, _) in data.snapshots.items():
+            if sn_id == sn.pk:
+                first_seen[person_id] = start_score
+        for person_id, score in first_seen.items():
+            if person_id is not None and person_id not in seen and score is not None:
+                scores[person_id] = score
+                seen.add(person_id)
+    return scores
+
+
+def get_previous_sn(sns: list, sn: SmashNight) -> Optional[SmashNight]:
+    """
+    The SmashNight whose end scores members carry into this one, as chosen by
+    store_previous_snapshot_or_current_scores: the earlier night with the highest
+    night_count, where nights without a night_count come first, as in PostgreSQL.
+    """
+    earlier_sns = [other for other in sns if other.date < sn.date]
+    if not earlier_sns:
+        return None
+    return max(earlier_sns, key=lambda other: (other.night_count is None, other.night_count or 0))
+
+
+def replay_season(data: SeasonData, parameters: ScoringParameters = DEFAULT_SCORING) -> ReplayResult:
+    """
+    Replay every night of a loaded season in memory, without touching the database.
+    The same loaded data can be replayed under different scoring parameters.
+    """
+    result = ReplayResult(season=data.season)
+    scores = get_starting_scores(data)
+    members = [person_id for person_id in data.members if scores.get(person_id) is not None]
+    for sn in data.sns:
+        # Start snapshot: members carry over their end score from the previous night
+        previous_sn = get_previous_sn(data.sns, sn)
+        if previous_sn is not None:
+            for person_id in members:
+                previous = result.snapshots.get((person_id, previous_sn.pk))
+                if previous is not None:
+                    scores[person_id] = previous[3]
+        ranks = get_competition_ranks({person_id: scores[person_id] for person_id in members})
+        for person_id in members:
+            result.snapshots[(person_id, sn.pk)] = [ranks[person_id], scores[person_id], None, None]
+
+        # Match score changes, from everyone's score going into the night
+        # The loaded rows are copied, so the same data can be replayed again
+        matches = [replace(match) for match in data.matches[sn.pk]]
+        scored_matches = [match for match in matches if match.is_scored]
+        for match in scored_matches:
+            if match.type == Match.BRACKET:
+                # Bracket matches keep the scores they were created with, and only take the
+                # current scores if they have none, as Bracket.create_matches does
+                if match.p1_score is None:
+                    match.p1_score = scores[match.p1_id]
+                if match.p2_score is None:
+                    match.p2_score = scores[match.p2_id]
+            else:
+                match.p1_score = scores[match.p1_id]
+                match.p2_score = scores[match.p2_id]
+        # The same kernel as set_all_score_changes, so the stored values are reproduced exactly
+        p1_score_changes, p2_score_changes = get_score_change_arrays(
+            [match.p1_score for match in scored_matches],
+            [match.p2_score for match in scored_matches],
+            [int(match.p1_wins) for match in scored_matches],
+            [int(match.p2_wins) for match in scored_matches],
+            parameters,
+        )
+        for match, p1_score_change, p2_score_change in zip(
+            scored_matches, p1_score_changes.tolist(), p2_score_changes.tolist()
+        ):
+            match.p1_score_change = to_stored_score(p1_score_change)
+            match.p2_score_change = to_stored_score(p2_score_change)
+        score_changes = defaultdict(Decimal)
+        for match in matches:
+            if match.p1_id is not None and match.p1_score_change is not None:
+                score_changes[match.p1_id] += match.p1_score_change
+            if match.p2_id is not None and match.p2_score_change is not None:
+                score_changes[match.p2_id] += match.p2_score_change
+        result.matches.extend(matches)
+
+        # Attendee ranks: seeded by score, ranked by best placement
+        attendees = [replace(attendee) for attendee in data.attendees[sn.pk]]
+        attendees_by_person = {attendee.person_id: attendee for attendee in attendees if attendee.person_id is not None}
+        best_placements = data.best_placements[sn.pk]
+        placement_scores = sorted(best_placements.values())
+        seeded_people = sorted(best_placements, key=lambda person_id: (-scores[person_id], person_id))
+        for rank_by_score, person_id in enumerate(seeded_people):
+            attendee = attendees_by_person.get(person_id)
+            if attendee is None:
+                attendee = ReplayAttendee(None, sn.pk, person_id, None, None, None, None)
+                attendees.append(attendee)
+                attendees_by_person[person_id] = attendee
+            attendee.start_seed = rank_by_score + 1
+            attendee.end_seed = bisect_left(placement_scores, best_placements[person_id]) + 1
+            attendee.start_score = scores[person_id]
+
+        # Attendee end scores, with the same kernel as SmashNight.update_attendee_scores
+        scored_attendees = [
+            attendee for attendee in attendees
+            if attendee.person_id is not None and None not in (attendee.start_score, attendee.start_seed, attendee.end_seed)
+        ]
+        end_scores = get_end_score_array(
+            [float(attendee.start_score + score_changes[attendee.person_id]) for attendee in scored_attendees],
+            [attendee.person_id in data.elites for attendee in scored_attendees],
+            [attendee.start_seed for attendee in scored_attendees],
+            [attendee.end_seed for attendee in scored_attendees],
+            len(attendees),
+            parameters,
+        )
+        for attendee, end_score in zip(scored_attendees, end_scores.tolist()):
+            attendee.end_score = to_stored_score(end_score)
+        result.attendees.extend(attendees)
+
+        # Score propagation: attendees take their end score, anyone else who played adds their score changes
+        for person_id in score_changes:
+            if person_id not in attendees_by_person:
+                scores[person_id] = scores[person_id] + score_changes[person_id]
+        for person_id, attendee in attendees_by_person.items():
+            scores[person_id] = attendee.end_score
+
+        # End snapshot
+        ranks = get_competition_ranks({person_id: scores[person_id] for person_id in members})
+        for person_id in members:
+            result.snapshots[(person_id, sn.pk)][2:] = [ranks[person_id], scores[person_id]]
+        result.score_history[sn.pk] = {person_id: scores[person_id] for person_id in members}
+        result.ranks = ranks
+    result.scores = scores
+    return result
+
+
+def get_replay_differences(data: SeasonData, result: ReplayResult) -> list:
+    """
+    Compare a replay with the database
+
+    Returns
+    -------
+    list
+        A (table, key, column, stored, replayed) tuple for every value that differs
+    """
+    differences = []
+    stored_matches = {
+        values[0]: values[1:] for values in Match.original_objects.filter(sn__in=data.sns).values_list(
+            'pk', 'p1_score', 'p2_score', 'p1_score_change', 'p2_score_change')
+    }
+    for match in result.matches:
+        replayed = (match.p1_score, match.p2_score, match.p1_score_change, match.p2_score_change)
+        for column, stored_value, replayed_value in zip(
+            ('p1_score', 'p2_score', 'p1_score_change', 'p2_score_change'), stored_matches[match.pk], replayed
+        ):
+            if stored_value != replayed_value:
+                differences.append(('match', match.pk, column, stored_value, replayed_value))
+    stored_attendees = {
+        values[0]: values[1:] for values in Attendee.objects.filter(sn__in=data.sns).values_list(
+            'pk', 'start_seed', 'end_seed', 'start_score', 'end_score')
+    }
+    for attendee in result.attendees:
+        replayed = (attendee.start_seed, attendee.end_seed, attendee.start_score, attendee.end_score)
+        if attendee.pk is None:
+            differences.append(('attendee', (attendee.sn_id, attendee.person_id), 'missing', None, replayed))
+            continue
+        for column, stored_value, replayed_value in zip(
+            ('start_seed', 'end_seed', 'start_score', 'end_score'), stored_attendees[attendee.pk], replayed
+        ):
+            if stored_value != replayed_value:
+                differences.append(('attendee', attendee.pk, column, stored_value, replayed_value))
+    for key, replayed in result.snapshots.items():
+        stored = data.snapshots.get(key, [None] * 4)
+        for column, stored_value, replayed_value in zip(
+            ('start_rank', 'start_score', 'end_rank', 'end_score'), stored, replayed
+        ):
+            if stored_value != replayed_value:
+                differences.append(('snapshot', key, column, stored_value, replayed_value))
+    return differences
+
+
+def is_latest_season(season: int) -> bool:
+    return SmashNight.objects.aggregate(Max('season'))['season__max'] == season
+
+
+@transaction.atomic
+def write_replay(data: SeasonData, result: ReplayResult, write_people: bool = None) -> None:
+    """
+    Write a replay's matches, attendees and snapshots back in bulk.
+    Everyone's current score and rank are only written for the latest season,
+    unless write_people says otherwise.
+    """
+    Match.original_objects.bulk_update(
+        [Match(pk=match.pk, p1_score=match.p1_score, p2_score=match.p2_score,
+               p1_score_change=match.p1_score_change, p2_score_change=match.p2_score_change)
+         for match in result.matches],
+        ['p1_score', 'p2_score', 'p1_score_change', 'p2_score_change'],
+        batch_size=1000,
+    )
+    Attendee.objects.bulk_create(
+        [Attendee(sn_id=attendee.sn_id, person_id=attendee.person_id,
+                  start_seed=attendee.start_seed, end_seed=attendee.end_seed,
+                  start_score=attendee.start_score, end_score=attendee.end_score)
+         for attendee in result.attendees if attendee.person_id is not None],
+        update_conflicts=True,
+        unique_fields=['sn', 'person'],
+        update_fields=['start_seed', 'end_seed', 'start_score', 'end_score'],
+        batch_size=1000,
+    )
+    PersonSnapshot.objects.bulk_create(
+        [PersonSnapshot(person_id=person_id, sn_id=sn_id, start_rank=start_rank, start_score=start_score,
+                        end_rank=end_rank, end_score=end_score)
+         for (person_id, sn_id), (start_rank, start_score, end_rank, end_score) in result.snapshots.items()],
+        update_conflicts=True,
+        unique_fields=['person', 'sn'],
+        update_fields=['start_rank', 'start_score', 'end_rank', 'end_score'],
+        batch_size=1000,
+    )
+    if write_people is None:
+        write_people = is_latest_season(result.season)
+    if write_people:
+        Person.objects.bulk_update(
+            [Person(pk=person_id, score=score) for person_id, score in result.scores.items()
+             if score != data.scores.get(person_id)],
+            ['score'],
+            batch_size=1000,
+        )
+        Person.objects.bulk_update(
+            [Person(pk=person_id, rank=rank) for person_id, rank in result.ranks.items()],
+            ['rank'],
+            batch_size=1000,
+        )
+    bump_data_version_on_commit()
@@ -0,0 +1,232 @@
+# scoring_logic.py
+
+# Match score change logic
+# A winner gains up to 5 points and a loser drops up to 3 points,
+# scaled by the difference between the players' scores going in.
+# Forfeits (a score of -1) change nothing.
+# Attendees also gain points for placing at or above their seed,
+# and no attendee's score drops below a floor of 60.
+# Every constant lives in ScoringParameters, so alternate rules can be simulated.
+
+from dataclasses import dataclass
+from typing import Iterable, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ScoringParameters:
+    """The constants of the scoring rules"""
+    # The most a match winner gains, and the most a loser drops
+    winner_points: float = 5
+    loser_points: float = 3
+    # The bases of the winner's and loser's curves, and the score difference they scale by
+    winner_base: float = 5.0
+    loser_base: float = 10.0
+    score_divisor: float = 80
+    # Placement points: the bonus spread over the attendees, the flat bonus, and the elite bonus
+    placement_bonus: float = 30
+    placement_base: float = 3
+    elite_bonus: float = 5.0
+    score_floor: float = 60.0
+
+
+DEFAULT_SCORING = ScoringParameters()
+
+
+def get_score_changes(
+    p1_score, p2_score, p1_wins: int, p2_wins: int, parameters: ScoringParameters = DEFAULT_SCORING
+) -> Tuple[float, float]:
+    """
+    Get the score changes for a single match
+
+    Parameters
+    ----------
+    p1_score, p2_score: Decimal or float
+        The scores of the players going into the match
+    p1_wins, p2_wins: int
+        The games won by each player, -1 for a forfeit
+    parameters: ScoringParameters
+        The scoring rules to use
+
+    Returns
+    -------
+    tuple
+        The (p1_score_change, p2_score_change)
+    """
+    if p1_wins == -1 or p2_wins == -1:
+        return 0, 0
+    p1_score = float(p1_score)
+    p2_score = float(p2_score)
+    winner_points, winner_base = parameters.winner_points, parameters.winner_base
+    loser_points, loser_base = parameters.loser_points, parameters.loser_base
+    divisor = parameters.score_divisor
+    if p1_wins > p2_wins:
+        p1_score_change = winner_points * (1 - 1 / (1 + winner_base ** ((p2_score - p1_score) / divisor)))
+        p2_score_change = -loser_points * (1 / (1 + loser_base ** ((p1_score - p2_score) / divisor)))
+    else:
+        p1_score_change = -loser_points * (1 / (1 + loser_base ** ((p2_score - p1_score) / divisor)))
+        p2_score_change = winner_points * (1 - 1 / (1 + winner_base ** ((p1_score - p2_score) / divisor)))
+    return p1_score_change, p2_score_change
+
+
+def get_competition_ranks(scores: dict) -> dict:
+    """
+    Rank everyone by score, highest first, with ties sharing a rank ("1, 2, 2, 4").
+    Anyone without a score is ranked after everyone with one.
+
+    Parameters
+    ----------
+    scores: dict
+        Maps each key, such as a person's pk, to their score or None
+
+    Returns
+    -------
+    dict
+        Maps each key to its rank
+    """
+    ranks = {}
+    c_rank = 1
+    prev_score = None
+    ordered_scores = sorted(scores.items(), key=lambda item: (item[1] is None, -(item[1] or 0)))
+    for position, (key, score) in enumerate(ordered_scores, start=1):
+        if score != prev_score:
+            c_rank = position
+            prev_score = score
+        ranks[key] = c_rank
+    return ranks
+
+
+def get_score_change_arrays(
+    p1_scores, p2_scores, p1_wins, p2_wins, parameters: ScoringParameters = DEFAULT_SCORING
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the score changes for many matches at once.
+    NumPy's vectorized power can differ from Python's in the last bit, so the
+    floats may not be identical to get_score_changes, but they round to the
+    same stored 2 decimal place values.
+
+    Parameters
+    ----------
+    p1_scores, p2_scores: array-like of Decimal or float
+        The scores of the players going into each match
+    p1_wins, p2_wins: array-like of int
+        The games won by each player, -1 for a forfeit
+    parameters: ScoringParameters
+        The scoring rules to use
+
+    Returns
+    -------
+    tuple
+        The (p1_score_changes, p2_score_changes) arrays
+    """
+    p1_scores = np.asarray(p1_scores, dtype=np.float64)
+    p2_scores = np.asarray(p2_scores, dtype=np.float64)
+    p1_wins = np.asarray(p1_wins, dtype=np.int64)
+    p2_wins = np.asarray(p2_wins, dtype=np.int64)
+    p1_won = p1_wins > p2_wins
+    # the loser's score minus the winner's score, over the divisor
+    divisor = parameters.score_divisor
+    exponent = np.where(p1_won, (p2_scores - p1_scores) / divisor, (p1_scores - p2_scores) / divisor)
+    winner_changes = parameters.winner_points * (1 - 1 / (1 + np.power(parameters.winner_base, exponent)))
+    loser_changes = -parameters.loser_points * (1 / (1 + np.power(parameters.loser_base, -exponent)))
+    forfeits = (p1_wins == -1) | (p2_wins == -1)
+    p1_score_changes = np.where(forfeits, 0.0, np.where(p1_won, winner_changes, loser_changes))
+    p2_score_changes = np.where(forfeits, 0.0, np.where(p1_won, loser_changes, winner_changes))
+    return p1_score_changes, p2_score_changes
+
+
+def set_all_score_changes(matches: Iterable) -> None:
+    """
+    Set p1_score_change and p2_score_change on every given match, without saving
+
+    Parameters
+    ----------
+    matches: iterable of Match
+        Matches with their p1_score, p2_score, p1_wins and p2_wins set
+    """
+    matches = list(matches)
+    if not matches:
+        return
+    p1_score_changes, p2_score_changes = get_score_change_arrays(
+        [match.p1_score for match in matches],
+        [match.p2_score for match in matches],
+        [int(match.p1_wins) for match in matches],
+        [int(match.p2_wins) for match in matches],
+    )
+    for match, p1_score_change, p2_score_change in zip(matches, p1_score_changes.tolist(), p2_score_changes.tolist()):
+        match.p1_score_change = p1_score_change
+        match.p2_score_change = p2_score_change
+
+
+def get_placement_score_change(
+    is_elite: bool, start_seed: int, end_seed: int, attendee_count: int, parameters: ScoringParameters = DEFAULT_SCORING
+) -> float:
+    """
+    Get an attendee's score change for their overall placement at a SmashNight
+
+    Parameters
+    ----------
+    is_elite: bool
+        Whether the attendee is an elite player
+    start_seed, end_seed: int
+        The attendee's seed going in and their final rank
+    attendee_count: int
+        The number of attendees at the SmashNight
+    parameters: ScoringParameters
+        The scoring rules to use
+
+    Returns
+    -------
+    float
+        The placement score change
+    """
+    points = parameters.elite_bonus if is_elite else 0.0
+    if start_seed >= end_seed:
+        points += (start_seed - end_seed + 0.5) * parameters.placement_bonus / attendee_count + parameters.placement_base
+    return points
+
+
+def get_end_score(
+    current_score: float, placement_score_change: float, parameters: ScoringParameters = DEFAULT_SCORING
+) -> float:
+    """Get an attendee's end score, which is never below the score floor"""
+    return max(current_score + placement_score_change, parameters.score_floor)
+
+
+def get_end_score_array(
+    current_scores, is_elite, start_seeds, end_seeds, attendee_count: int,
+    parameters: ScoringParameters = DEFAULT_SCORING,
+) -> np.ndarray:
+    """
+    Get the end scores for all attendees of a SmashNight at once.
+    This matches Attendee.update_end_score for each attendee.
+
+    Parameters
+    ----------
+    current_scores: array-like of float
+        Each attendee's start score plus their match score changes
+    is_elite: array-like of bool
+        Whether each attendee is an elite player
+    start_seeds, end_seeds: array-like of int
+        Each attendee's seed going in and their final rank
+    attendee_count: int
+        The number of attendees at the SmashNight
+    parameters: ScoringParameters
+        The scoring rules to use
+
+    Returns
+    -------
+    np.ndarray
+        The end scores, never below the score floor
+    """
+    current_scores = np.asarray(current_scores, dtype=np.float64)
+    start_seeds = np.asarray(start_seeds, dtype=np.int64)
+    end_seeds = np.asarray(end_seeds, dtype=np.int64)
+    points = np.where(np.asarray(is_elite, dtype=bool), parameters.elite_bonus, 0.0)
+    # attendees who placed at or above their seed get a placement bonus
+    placement_bonus = (
+        (start_seeds - end_seeds + 0.5) * parameters.placement_bonus / attendee_count + parameters.placement_base
+    )
+    points = np.where(start_seeds >= end_seeds, points + placement_bonus, points)
+    return np.maximum(current_scores + points, parameters.score_floor)
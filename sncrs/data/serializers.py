@@ -4,8 +4,9 @@ from data.models import (
     Match, PersonSnapshot, SmashNight,
     Person, Character, Greeting, Matchup, Medal, Clip, ClipTag,
     Quote, QuoteTag, QuoteSpeaker, Whine, SocialLink, Site,
-    Lesson, TwitchToken, GameTitle,
+    Lesson, TwitchToken, GameTitle, PersonRivalry,
 )
+from data.scoring_logic import ScoringParameters, DEFAULT_SCORING
 
 display_name_related_serializer = lambda: serializers.SlugRelatedField(
     allow_null=True,
@@ -140,24 +141,38 @@ class PersonSerializer(serializers.ModelSerializer):
             'medals',
             ]
     
+    def get_game_title_names(self):
+        # Shared by every person in a list, so the game titles are only loaded once
+        if 'game_title_names' not in self.context:
+            self.context['game_title_names'] = list(GameTitle.objects.values_list('name', flat=True))
+        return self.context['game_title_names']
+
     def get_mains(self, obj):
-        mains = {}
-        for gt in GameTitle.objects.all():
-            mains[gt.name] = list(
-                obj.main_set.filter(character__game_title=gt)
-                    .order_by('order')
-                    .values_list('character__name', flat=True)[:3]
-            )
+        # Read the prefetched mains, which are ordered with their characters loaded
+        mains = {name: [] for name in self.get_game_title_names()}
+        for main in obj.main_set.all():
+            game_title_mains = mains.setdefault(main.character.game_title.name, [])
+            if len(game_title_mains) < 3:
+                game_title_mains.append(main.character.name)
         return mains
 
+    def get_rivalries(self, obj, kind):
+        # Read the precomputed top rivals or demons, which are in rank order
+        rivalries = {name: [] for name in self.get_game_title_names()}
+        for rivalry in obj.rivalry_set.all():
+            if rivalry.kind == kind:
+                opponent_name = rivalry.opponent.display_name if rivalry.opponent else None
+                rivalries.setdefault(rivalry.game_title.name, []).append(opponent_name)
+        return rivalries
+
     def get_rivals(self, obj):
-        return {game_title: names[:2] for game_title, names in obj.rivals.items()}
+        return self.get_rivalries(obj, PersonRivalry.Kind.RIVAL)
     
     def get_demons(self, obj):
-        return {game_title: names[:1] for game_title, names in obj.demons.items()}
+        return self.get_rivalries(obj, PersonRivalry.Kind.DEMON)
     
     def get_all_names(self, obj):
-        return [obj.display_name, *list(obj.alias_set.values_list('name', flat=True))]
+        return [obj.display_name, *[alias.name for alias in obj.alias_set.all()]]
 
 
 class GreetingSerializer(serializers.ModelSerializer):
@@ -299,8 +314,9 @@ class QuoteSerializer(serializers.ModelSerializer):
         for tag in tag_data:
             tag_object, _ = QuoteTag.objects.get_or_create(tag=tag)
             quote.tags.add(tag_object.id)
+        people_by_name = Person.objects.resolve_names(speaker_data)
         for speaker in speaker_data:
-            sncrs_person = Person.objects.get_person(speaker)
+            sncrs_person = people_by_name[speaker]
             if sncrs_person is None:
                 speaker_object, _ = QuoteSpeaker.objects.update_or_create(name=speaker)
             else:
@@ -348,4 +364,25 @@ class GameTitleSerializer(serializers.ModelSerializer):
         model = GameTitle
         fields = [
             'name',
-        ]
\ No newline at end of file
+        ]
+
+class ScoringSimulationSerializer(serializers.Serializer):
+    """
+    The season and scoring parameters for a what-if scoring simulation.
+    The parameters are bounded, though extreme combinations can still overflow a replay.
+    """
+    season = serializers.IntegerField()
+    winner_points = serializers.FloatField(default=DEFAULT_SCORING.winner_points, min_value=0, max_value=1000)
+    loser_points = serializers.FloatField(default=DEFAULT_SCORING.loser_points, min_value=0, max_value=1000)
+    winner_base = serializers.FloatField(default=DEFAULT_SCORING.winner_base, min_value=0.01, max_value=1000)
+    loser_base = serializers.FloatField(default=DEFAULT_SCORING.loser_base, min_value=0.01, max_value=1000)
+    score_divisor = serializers.FloatField(default=DEFAULT_SCORING.score_divisor, min_value=1, max_value=10000)
+    placement_bonus = serializers.FloatField(default=DEFAULT_SCORING.placement_bonus, min_value=-1000, max_value=1000)
+    placement_base = serializers.FloatField(default=DEFAULT_SCORING.placement_base, min_value=-1000, max_value=1000)
+    elite_bonus = serializers.FloatField(default=DEFAULT_SCORING.elite_bonus, min_value=-1000, max_value=1000)
+    score_floor = serializers.FloatField(default=DEFAULT_SCORING.score_floor, min_value=0, max_value=10000)
+
+    def get_parameters(self) -> ScoringParameters:
+        parameters = dict(self.validated_data)
+        parameters.pop('season')
+        return ScoringParameters(**parameters)
@@ -0,0 +1,43 @@
+# signals.py
+
+# Admin edits to the data shown on the public pages make the cached pages stale,
+# and edits to a matchup rank that person's rivals and demons again.
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache_logic import bump_data_version, bump_data_version_on_commit
+from .models import (
+    Attendee, Bracket, Character, GameTitle, Matchup, MatchupType, Medal, Person, PersonRivalry,
+    PersonSnapshot, Placement, PreferredCharacter, SmashNight, Team,
+)
+
+# Every model whose rows are shown on the cached public pages
+PAGE_MODELS = (
+    Person, Team, Medal, Matchup, MatchupType, GameTitle, PersonSnapshot, Attendee,
+    SmashNight, Bracket, Placement, PreferredCharacter, Character,
+)
+
+
+def invalidate_page_cache(sender, **kwargs):
+    bump_data_version_on_commit()
+
+
+def rebuild_matchup_rivalries(sender, instance, **kwargs):
+    if instance.px_id is None:
+        return
+
+    def rebuild():
+        PersonRivalry.objects.rebuild(instance.game_title, {instance.px_id})
+        # The pages were made stale when the matchup was saved, but may have been cached again since
+        bump_data_version()
+
+    transaction.on_commit(rebuild)
+
+
+for model in PAGE_MODELS:
+    post_save.connect(invalidate_page_cache, sender=model, dispatch_uid=f"invalidate_page_cache_save_{model.__name__}")
+    post_delete.connect(invalidate_page_cache, sender=model, dispatch_uid=f"invalidate_page_cache_delete_{model.__name__}")
+
+post_save.connect(rebuild_matchup_rivalries, sender=Matchup, dispatch_uid="rebuild_matchup_rivalries_save")
+post_delete.connect(rebuild_matchup_rivalries, sender=Matchup, dispatch_uid="rebuild_matchup_rivalries_delete")
@@ -1,48 +1,199 @@
 # sn_calculate.py
 
+# A full update of a SmashNight runs as a pipeline of named stages.
+# Challonge data is fetched first, then every stage that writes to the
+# database runs inside one transaction, so a failed update changes nothing.
+# The time, queries, and rows written for each stage are recorded in an UpdateRun
+# as soon as the stage finishes, so a running update can be followed from the admin.
+
+import logging
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .cache_logic import bump_data_version_on_commit
+from .challonge_logic import fetch_all_bracket_data, CACHE_USE
 from .utility_functions import update_all_scores
 from .snapshot_logic import store_previous_snapshot_or_current_scores
-from .models import GameTitle, Matchup, Medal, Person
+from .models import GameTitle, Matchup, Medal, Person, PersonRivalry, UpdateRun
+
+logger = logging.getLogger(__name__)
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+class StageCounter:
+    """Count the queries run and rows written through the database connection"""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+            self.rows += max(context["cursor"].rowcount, 0)
+        return result
+
 
+def write_outside_transaction(write, description: str) -> None:
+    """
+    Run a small write so that it is visible straight away, even from inside a transaction.
+    On PostgreSQL the write runs in another thread, which has its own database connection.
 
-def set_challonge_data(sn):
+    Parameters
+    ----------
+    write: callable
+        Runs the write, taking no arguments
+    description: str
+        What is being written, for the log if the write fails
+    """
+    if connection.vendor != 'postgresql':
+        # Other databases may lock out a second writer until the transaction ends
+        write()
+        return
+
+    def write_in_thread():
+        try:
+            write()
+        except Exception:
+            logger.exception(f"Could not record {description}")
+        finally:
+            connections.close_all()
+
+    write_thread = threading.Thread(target=write_in_thread)
+    write_thread.start()
+    write_thread.join()
+
+
+@contextmanager
+def run_stage(update_run, name):
+    """Record the time, queries, and rows written for the stage run inside this block"""
+    counter = StageCounter()
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(counter):
+            yield
+    finally:
+        # A failed stage is recorded too, as the last stage of the run
+        seconds = time.perf_counter() - start
+        update_run.stages.append(dict(name=name, seconds=round(seconds, 3), queries=counter.queries, rows=counter.rows))
+        logger.info(f"{update_run.sn}: {name} took {seconds:.2f}s, {counter.queries} queries, {counter.rows} rows")
+        stages = list(update_run.stages)
+        write_outside_transaction(
+            lambda: UpdateRun.objects.filter(pk=update_run.pk).update(stages=stages),
+            f"the stages of update run {update_run.pk}",
+        )
+
+
+def write_challonge_data(sn, brackets, bracket_data):
     # Create all the matches for this smashNight
-    for bracket in sn.bracket_set.all():
-        bracket.create_matches()
+    for bracket in brackets:
+        bracket.create_matches(bracket_data[bracket.pk])
     # update any added challenge matches
     sn.update_all_challenge_matches()
     # Create all the bracket rankings for this smashNight
-    for bracket in sn.bracket_set.all():
+    for bracket in brackets:
         bracket.create_bracket_ranks()
 
 
-def set_sncrs_data(sn):
-    # create or update the matchup table and medal counts for each game title played this night
+def verify_matchups(game_title) -> bool:
+    # Compare the matchups table with a full recount, and rebuild it if they disagree.
+    # Returns whether the table was rebuilt
+    differences = Matchup.objects.get_rebuild_differences(game_title)
+    if not differences:
+        return False
+    for (px_id, py_id), stored, expected in differences:
+        logger.warning(f"Matchup {px_id} vs {py_id} in {game_title} has wins {stored}, expected {expected}")
+    logger.warning(f"{len(differences)} matchups in {game_title} disagreed with a full rebuild, rebuilding")
+    Matchup.objects.create_or_update_matchups_table(game_title=game_title)
+    return True
+
+
+def set_matchups_and_medals(sn, verify=False):
+    # update the matchups and medal counts for each game title played this night
     for game_title in GameTitle.objects.filter(bracket__sn=sn).distinct():
         # Limit calculations to attendees
         attendees = Person.objects.filter(
             placement__bracket__sn=sn, placement__bracket__game_title=game_title
         ).distinct()
-        Matchup.objects.create_or_update_matchups_table(game_title=game_title)
+        # Only the pairs who played this night can have changed
+        person_ids = Matchup.objects.update_matchups_for_sn(sn, game_title)
+        if verify and verify_matchups(game_title):
+            person_ids = None
+        # Rank the top rivals and demons again for everyone whose matchups changed
+        PersonRivalry.objects.rebuild(game_title, person_ids)
         Medal.objects.create_or_update_medal_counts(game_title=game_title, person_list=attendees)
-    # Create all the attendee rankings for this smashNight and record initial scores
-    sn.create_all_attendee_ranks()
-    # update attendee scores
-    sn.update_attendee_scores()
-    # update everyone's scores
-    update_all_scores(sn)
 
 
-def full_update(sn):
+def full_update(sn, verify=False, cache_mode=CACHE_USE, on_stage=None, update_run=None) -> UpdateRun:
+    """
+    Fetch all data for a SmashNight and update everyone's scores
+
+    Parameters
+    ----------
+    sn: SmashNight
+        The SmashNight to update
+    verify: bool
+        Whether to check the matchups against a full rebuild
+    cache_mode: str
+        How to use the Challonge cache, see challonge_logic
+    on_stage: callable
+        If provided, called with the name of each stage as it starts
+    update_run: UpdateRun
+        The record to fill in. If not provided, a new one is created.
 
-    # Store current scores as Snapshot for each person
-    store_previous_snapshot_or_current_scores(sn, "start")
+    Returns
+    -------
+    UpdateRun
+        The record of this update and its stages
+    """
+    if update_run is None:
+        update_run = UpdateRun.objects.create(sn=sn)
 
-    # create matches and brackets with challonge data
-    set_challonge_data(sn)
+    def stage(name):
+        if on_stage is not None:
+            on_stage(name)
+        return run_stage(update_run, name)
 
-    # create attendee rankings, scores, and update everyone's scores
-    set_sncrs_data(sn)
+    try:
+        brackets = list(sn.bracket_set.all())
+        with stage("fetch challonge"):
+            bracket_data = fetch_all_bracket_data(brackets, cache_mode)
 
-    # Store the updated scores as Snapshot for each person
-    store_previous_snapshot_or_current_scores(sn, "end")
+        with transaction.atomic():
+            # Store current scores as Snapshot for each person
+            with stage("start snapshot"):
+                store_previous_snapshot_or_current_scores(sn, "start")
+            # create matches and brackets with challonge data
+            with stage("challonge matches"):
+                write_challonge_data(sn, brackets, bracket_data)
+            with stage("matchups and medals"):
+                set_matchups_and_medals(sn, verify=verify)
+            # Create all the attendee rankings for this smashNight and record initial scores
+            with stage("attendee ranks"):
+                sn.create_all_attendee_ranks()
+            with stage("attendee scores"):
+                sn.update_attendee_scores()
+            # update everyone's scores
+            with stage("score propagation"):
+                update_all_scores(sn)
+            # Store the updated scores as Snapshot for each person
+            with stage("end snapshot"):
+                store_previous_snapshot_or_current_scores(sn, "end")
+    except Exception:
+        update_run.status = UpdateRun.Status.FAILED
+        update_run.error = traceback.format_exc()
+        raise
+    else:
+        update_run.status = UpdateRun.Status.SUCCEEDED
+        bump_data_version_on_commit()
+    finally:
+        update_run.finished_at = timezone.now()
+        update_run.save()
+    return update_run
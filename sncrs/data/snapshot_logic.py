@@ -11,34 +11,37 @@ from .utility_functions import assign_score_based_ranks
 
 # Store the current scores of each person in a snapshot
 def store_previous_snapshot_or_current_scores(c_sn, score_type):
-    # calculate current ranks
-    people = Person.objects.filter(tag=Person.MEMBER)
+    people = list(Person.objects.filter(tag=Person.MEMBER))
     previous_sn_in_season = SmashNight.objects.filter(season=c_sn.season, date__lt=c_sn.date).order_by('-night_count').first()
     if score_type == "start" and previous_sn_in_season:
+        # Restore everyone's score from the previous SmashNight's snapshot, if they have one
+        previous_scores = dict(
+            PersonSnapshot.objects.filter(sn=previous_sn_in_season).values_list('person', 'end_score')
+        )
+        restored_people = []
         for c_person in people:
-            try:
-                previous = PersonSnapshot.objects.get(person=c_person, sn=previous_sn_in_season)
-                c_person.score=previous.end_score
-                c_person.save()
-            except PersonSnapshot.DoesNotExist:
-                pass
-        # Reload to get the new scores
-        people = Person.objects.all().filter(tag=Person.MEMBER)
-    assign_score_based_ranks(people)
+            if c_person.pk in previous_scores:
+                c_person.score = previous_scores[c_person.pk]
+                restored_people.append(c_person)
+        Person.objects.bulk_update(restored_people, ['score'], batch_size=1000)
+    # calculate current ranks
+    ranks = assign_score_based_ranks(people)
 
+    snapshots = []
     for c_person in people:
         if score_type == "start":
-            update_vals = {
-                "start_rank": c_person.rank,
-                "start_score": c_person.score,
-            }
+            update_fields = ["start_rank", "start_score"]
+            snapshot = PersonSnapshot(person=c_person, sn=c_sn, start_rank=ranks[c_person.pk], start_score=c_person.score)
         elif score_type == "end":
-            update_vals = {
-                "end_rank": c_person.rank,
-                "end_score": c_person.score,
-            }
-        c_sn.personsnapshot_set.update_or_create(
-            person=c_person,
-            sn=c_sn,
-            defaults=update_vals
-        )
+            update_fields = ["end_rank", "end_score"]
+            snapshot = PersonSnapshot(person=c_person, sn=c_sn, end_rank=ranks[c_person.pk], end_score=c_person.score)
+        snapshots.append(snapshot)
+    if not snapshots:
+        return
+    PersonSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=["person", "sn"],
+        update_fields=update_fields,
+        batch_size=1000,
+    )
@@ -18,62 +18,6 @@ def filled_slice(value, desired_length):
     resulting_list += [None] * desired_length
     return resulting_list
 
-@register.filter
-def check_attendee_seed(c_sn, c_person):
-    try:
-        attendee = c_sn.attendee_set.get(person=c_person)
-    except:
-        attendee = None
-    if attendee == None:
-        return "--"
-    else:
-        return attendee.start_seed
-
-@register.filter
-def check_attendee_place(c_sn, c_person):
-    try:
-        attendee = c_sn.attendee_set.get(person=c_person)
-    except:
-        attendee = None
-    if attendee == None:
-        return "--"
-    else:
-        return attendee.end_seed
-
-@register.filter
-def check_attendee_score(c_sn, c_person):
-    headcount = c_sn.attendee_set.count()
-    try:
-        attendee = c_sn.attendee_set.get(person=c_person)
-    except:
-        attendee = None
-    if attendee == None:
-        return "--"
-    else:
-        return round(attendee.get_placement_score_change(),2)
-
-@register.filter
-def check_person_rank(c_sn, c_person):
-    try:
-        attendee = c_sn.personsnapshot_set.get(person=c_person)
-    except:
-        attendee = None
-    if attendee == None:
-        return "--"
-    else:
-        return attendee.end_rank
-
-@register.filter
-def check_person_score(c_sn, c_person):
-    try:
-        attendee = c_sn.personsnapshot_set.get(person=c_person)
-    except:
-        attendee = None
-    if attendee == None:
-        return "--"
-    else:
-        return attendee.end_score
-
 @register.filter
 def py_member_filter(matchups):
     return matchups.filter(py__tag=Person.MEMBER)
@@ -101,28 +45,6 @@ def get_matchup(person_x, person_y):
         matchup = None
     return matchup
 
-@register.simple_tag
-def get_matchup_for_game(person_x, person_y, game_title):
-    try:
-        return person_x.px_matchup_set.get(py=person_y, game_title=game_title)
-    except:
-        return None
-
-@register.filter
-def get_item(d, key):
-    return d.get(key)
-
-@register.simple_tag
-def get_mains_for_game(person, game_title):
-    return person.main_set.filter(character__game_title=game_title).order_by('order')
-
-@register.simple_tag
-def get_medal_for_game(person, game_title):
-    try:
-        return person.medal_set.get(game_title=game_title)
-    except:
-        return None
-
 @register.filter
 def get_smashnights(person, sns_to_include):
     sn_set = sns_to_include.filter(Q(match__p1=person) | Q(match__p2=person)).distinct()
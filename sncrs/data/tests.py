@@ -1,3 +1,527 @@
-from django.test import TestCase
+import datetime
+import json
+import random
+import re
+import tempfile
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import challonge_logic
+from .challonge_logic import CACHE_BYPASS, CACHE_USE, fetch_all_bracket_data, get_http_client
+from .grid_logic import EMPTY_CELL, get_matchup_grids, get_placement_grid, get_week_grid
+from .profile_logic import get_player_profiles
+from .models import (
+    Alias, Attendee, Bracket, Character, GameTitle, Match, Matchup, Medal, Person, PersonRivalry, PersonSnapshot,
+    Placement, PreferredCharacter, Site, SmashNight, SocialLink,
+)
+from .replay_logic import load_season, replay_season, to_stored_score, write_replay
+from .scoring_logic import DEFAULT_SCORING, ScoringParameters, get_competition_ranks, get_score_change_arrays, get_score_changes
+from .sn_calculate import full_update, write_challonge_data
+from .utility_functions import update_all_scores
+
+
+def create_people(count, prefix="Player", score=100):
+    return [
+        Person.objects.create(display_name=f"{prefix}{number}", score=Decimal(score + number))
+        for number in range(count)
+    ]
+
+
+def create_characters(game_titles, count=4):
+    return {
+        game_title.pk: [
+            Character.objects.create(name=f"Character{number}", game_title=game_title) for number in range(count)
+        ]
+        for game_title in game_titles
+    }
+
+
+def create_members(count, game_titles, characters):
+    """Members with a medal, a main for each of the characters, two rivals and a demon in each game"""
+    people = create_people(count, prefix=f"Group{count}Player")
+    for index, person in enumerate(people):
+        person.tag = Person.MEMBER
+        person.save()
+        for game_title in game_titles:
+            Medal.objects.create(person=person, game_title=game_title, elite_gold=index)
+            for order, character in enumerate(characters[game_title.pk], start=1):
+                PreferredCharacter.objects.create(person=person, character=character, order=order)
+            opponents = [people[(index + offset) % count] for offset in (1, 2, 3)]
+            for rank, opponent in enumerate(opponents[:2], start=1):
+                PersonRivalry.objects.create(
+                    person=person, game_title=game_title, kind=PersonRivalry.Kind.RIVAL, rank=rank, opponent=opponent
+                )
+            PersonRivalry.objects.create(
+                person=person, game_title=game_title, kind=PersonRivalry.Kind.DEMON, rank=1, opponent=opponents[2]
+            )
+    return people
+
+
+class FakeChallonge:
+    """Answers Challonge API requests for the given tournaments through an httpx.MockTransport"""
+
+    def __init__(self, tournaments):
+        # slug -> (tournament id, participant names, matches as (player1 index, player2 index, scores_csv, round))
+        self.tournaments = tournaments
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get_http_client(self, *args, **kwargs):
+        return httpx.Client(transport=httpx.MockTransport(self.handle_request))
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self.lock:
+            self.requests.append(request)
+        slug, kind = re.fullmatch(r"/v1/tournaments/([^/]+?)(/participants|/matches)?\.json", request.url.path).groups()
+        tournament_id, names, matches = next(
+            tournament for key, tournament in self.tournaments.items() if slug in (key, str(tournament[0]))
+        )
+        if kind is None:
+            body = {"tournament": {
+                "id": tournament_id, "name": slug, "url": slug, "tournament_type": "double elimination", "state": "complete",
+            }}
+        elif kind == "/participants":
+            body = [
+                {"participant": {
+                    "id": tournament_id * 100 + index, "tournament_id": tournament_id, "name": name, "seed": index + 1,
+                }}
+                for index, name in enumerate(names)
+            ]
+        else:
+            body = [
+                {"match": {
+                    "id": tournament_id * 1000 + index, "tournament_id": tournament_id, "state": "complete",
+                    "identifier": str(index),
+                    "round": match_round, "player1_id": tournament_id * 100 + player1,
+                    "player2_id": tournament_id * 100 + player2, "scores_csv": scores_csv,
+                }}
+                for index, (player1, player2, scores_csv, match_round) in enumerate(matches)
+            ]
+        return httpx.Response(200, json=body)
+
+
+class ChallongeFetchTests(TestCase):
+
+    def setUp(self):
+        self.game_title, _ = GameTitle.objects.get_or_create(name="SSBU")
+        self.sn = SmashNight.objects.create(season=1, date=datetime.date(2026, 1, 1))
+        self.people = create_people(8)
+        tournaments = {}
+        for rank in (1, 2):
+            group = self.people[rank * 4 - 4:rank * 4]
+            slug = f"sncrs_test_{rank}"
+            # Names are matched case-insensitively, and unknown participants are skipped
+            names = [person.display_name.upper() for person in group] + ["Not A Member"]
+            matches = [(0, 1, "2-1", 1), (2, 3, "0-2", 1), (0, 3, "2-0", 2), (1, 2, "-1-0", -1), (0, 4, "2-0", 1)]
+            tournaments[slug] = (rank, names, matches)
+            Bracket.objects.create(
+                sn=self.sn, title=f"Bracket {rank}", rank=rank,
+                url=f"{challonge_logic.CHALLONGE_URL_PREFIX}{slug}", game_title=self.game_title,
+            )
+        self.fake_challonge = FakeChallonge(tournaments)
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.enterContext(override_settings(CHALLONGE_CACHE_DIR=cache_dir.name))
+        self.enterContext(mock.patch.object(challonge_logic, "get_http_client", self.fake_challonge.get_http_client))
+        self.enterContext(mock.patch.dict("os.environ", {"CHALLONGE_USER": "user", "CHALLONGE_KEY": "key"}))
+
+    def test_fetch_then_write(self):
+        brackets = list(self.sn.bracket_set.all())
+        bracket_data = fetch_all_bracket_data(brackets, CACHE_USE)
+        # A tournament, participants and matches request for each bracket
+        self.assertEqual(len(self.fake_challonge.requests), 6)
+        self.assertEqual(set(bracket_data), {bracket.pk for bracket in brackets})
+
+        write_challonge_data(self.sn, brackets, bracket_data)
+        matches = Match.original_objects.filter(sn=self.sn)
+        # The match against the unknown participant is skipped
+        self.assertEqual(matches.count(), 8)
+        forfeit = matches.get(challonge_id=1003)
+        self.assertEqual((forfeit.p1, forfeit.p2, forfeit.p1_wins, forfeit.p2_wins), (self.people[1], self.people[2], -1, 0))
+        self.assertEqual(Placement.objects.filter(bracket__sn=self.sn).count(), 8)
+
+        # The completed tournaments are cached, so fetching again sends no requests
+        self.assertEqual(fetch_all_bracket_data(brackets, CACHE_USE), bracket_data)
+        self.assertEqual(len(self.fake_challonge.requests), 6)
+
+    def test_fetch_through_api_url(self):
+        # Serve the fake Challonge API over HTTP, the way a local fake server would be used
+        fake_challonge = self.fake_challonge
+
+        class FakeChallongeHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                request = httpx.Request("GET", f"http://{self.headers['Host']}{self.path.removeprefix('/fake')}")
+                response = fake_challonge.handle_request(request)
+                self.send_response(response.status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response.content)))
+                self.end_headers()
+                self.wfile.write(response.content)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeChallongeHandler)
+        self.addCleanup(server.server_close)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        api_url = f"http://127.0.0.1:{server.server_port}/fake/v1"
+        with (
+            mock.patch.object(challonge_logic, "CHALLONGE_API_URL", api_url),
+            mock.patch.object(challonge_logic, "get_http_client", get_http_client),
+        ):
+            bracket_data = fetch_all_bracket_data(self.sn.bracket_set.all(), CACHE_BYPASS)
+        self.assertEqual(len(fake_challonge.requests), 6)
+        self.assertEqual({request.url.host for request in fake_challonge.requests}, {"127.0.0.1"})
+        participants, matches = bracket_data[self.sn.bracket_set.get(rank=1).pk]
+        self.assertEqual((len(participants), len(matches)), (5, 5))
+
+
+def baseline_score_changes(p1_score, p2_score, p1_wins, p2_wins):
+    """Match.set_score_changes as it was before the scoring rules were parameterized"""
+    if int(p1_wins) == -1 or int(p2_wins) == -1:
+        return 0, 0
+    elif p1_wins > p2_wins:
+        return (
+            5 * (1 - 1 / (1 + 5.0 ** ((float(p2_score) - float(p1_score)) / 80))),
+            -3 * (1 / (1 + 10.0 ** ((float(p1_score) - float(p2_score)) / 80))),
+        )
+    else:
+        return (
+            -3 * (1 / (1 + 10.0 ** ((float(p2_score) - float(p1_score)) / 80))),
+            5 * (1 - 1 / (1 + 5.0 ** ((float(p1_score) - float(p2_score)) / 80))),
+        )
+
+
+class ScoreChangeArrayTests(SimpleTestCase):
+
+    def assert_arrays_match(self, p1_scores, p2_scores, p1_wins, p2_wins, parameters):
+        # Compare the values as the 2 decimal place score change columns store them
+        p1_changes, p2_changes = get_score_change_arrays(p1_scores, p2_scores, p1_wins, p2_wins, parameters)
+        for index, match in enumerate(zip(p1_scores, p2_scores, p1_wins, p2_wins)):
+            with self.subTest(match=match, parameters=parameters):
+                expected = [to_stored_score(change) for change in get_score_changes(*match, parameters)]
+                if parameters == DEFAULT_SCORING:
+                    self.assertEqual([to_stored_score(change) for change in baseline_score_changes(*match)], expected)
+                self.assertEqual([to_stored_score(p1_changes[index]), to_stored_score(p2_changes[index])], expected)
+
+    def test_matches_get_score_changes(self):
+        # The default rules must score every match exactly as they did before the refactor
+        rng = random.Random(0)
+        results = [(2, 0), (2, 1), (3, 1), (1, 2), (0, 2), (1, 1), (0, 0), (-1, 0), (0, -1), (2, -1)]
+        for parameters in (
+            ScoringParameters(),
+            ScoringParameters(winner_points=8, loser_points=2, winner_base=3, loser_base=20, score_divisor=40),
+        ):
+            p1_scores = [Decimal(rng.randint(0, 50000)) / 100 for _ in range(500)]
+            # Every few matches are between players with the same score
+            p2_scores = [
+                p1_score if index % 7 == 0 else Decimal(rng.randint(0, 50000)) / 100
+                for index, p1_score in enumerate(p1_scores)
+            ]
+            p1_wins, p2_wins = zip(*(rng.choice(results) for _ in p1_scores))
+            self.assert_arrays_match(p1_scores, p2_scores, p1_wins, p2_wins, parameters)
+
+    def test_ties_and_forfeits(self):
+        # A tied result counts as a win for p2, and a forfeit by either player changes nothing
+        p1_scores = [100, 100, 150, 150, 80]
+        p2_scores = [100, 150, 100, 150, 120]
+        p1_wins = [1, 1, -1, 2, 0]
+        p2_wins = [1, 1, 0, -1, 0]
+        self.assert_arrays_match(p1_scores, p2_scores, p1_wins, p2_wins, ScoringParameters())
+        p1_changes, p2_changes = get_score_change_arrays(p1_scores, p2_scores, p1_wins, p2_wins)
+        self.assertEqual(p1_changes[2:4].tolist(), [0, 0])
+        self.assertEqual(p2_changes[2:4].tolist(), [0, 0])
+        self.assertLess(p1_changes[0], 0)
+        self.assertGreater(p2_changes[0], 0)
+
+
+class UpdateAllScoresTests(TestCase):
+
+    def setUp(self):
+        self.game_title, _ = GameTitle.objects.get_or_create(name="SSBU")
+
+    def create_night(self, count):
+        """A SmashNight where half of count people attend, and the rest only play challenge matches"""
+        sn = SmashNight.objects.create(season=1, date=datetime.date(2026, 1, 1) + datetime.timedelta(days=count))
+        people = create_people(count, prefix=f"Night{count}Player")
+        attendees, challengers = people[:count // 2], people[count // 2:]
+        for number, person in enumerate(attendees):
+            Attendee.objects.create(sn=sn, person=person, end_score=Decimal(200 + number))
+        for person, opponent in zip(challengers, reversed(challengers)):
+            Match.original_objects.create(
+                sn=sn, p1=person, p2=opponent, p1_wins=2, p2_wins=1, type=Match.CHALLENGE, game_title=self.game_title,
+                p1_score_change=Decimal("1.50"), p2_score_change=Decimal("-0.25"),
+            )
+        return sn, attendees, challengers
+
+    def assert_scores_updated(self, attendees, challengers, start_scores):
+        for number, person in enumerate(attendees):
+            person.refresh_from_db()
+            self.assertEqual(person.score, Decimal(200 + number))
+        for person in challengers:
+            # Each challenger plays once as p1 and once as p2
+            person.refresh_from_db()
+            self.assertEqual(person.score, start_scores[person.pk] + Decimal("1.25"))
+
+    def test_query_count_is_constant(self):
+        sn, attendees, challengers = self.create_night(8)
+        start_scores = {person.pk: person.score for person in challengers}
+        with CaptureQueriesContext(connection) as queries:
+            update_all_scores(sn)
+        self.assert_scores_updated(attendees, challengers, start_scores)
+
+        # Four times as many people take the same queries
+        sn, attendees, challengers = self.create_night(32)
+        start_scores = {person.pk: person.score for person in challengers}
+        with self.assertNumQueries(len(queries)):
+            update_all_scores(sn)
+        self.assert_scores_updated(attendees, challengers, start_scores)
+
+
+class CompetitionRankTests(SimpleTestCase):
+
+    def test_ties_and_missing_scores(self):
+        ranks = get_competition_ranks({"a": Decimal(90), "b": None, "c": Decimal(120), "d": Decimal(90), "e": None})
+        self.assertEqual(ranks, {"c": 1, "a": 2, "d": 2, "b": 4, "e": 4})
+
+
+class SeasonReplayTests(TestCase):
+
+    def setUp(self):
+        self.game_title, _ = GameTitle.objects.get_or_create(name="SSBU")
+        self.people = create_people(8)
+        # Everyone is a member. Updating an old night again starts a guest from their
+        # latest score rather than their score at the time, which only a replay gets right
+        for person in self.people:
+            person.tag = Person.MEMBER
+            person.status = Person.ELITE if person == self.people[0] else Person.CHALLENGER
+            person.save()
+        tournaments = {}
+        self.sns = []
+        for night in range(1, 4):
+            sn = SmashNight.objects.create(
+                season=1, night_count=night, date=datetime.date(2026, 1, 1) + datetime.timedelta(weeks=night)
+            )
+            self.sns.append(sn)
+            # A different six people attend each night
+            group = self.people[night - 1:night + 5]
+            slug = f"sncrs_replay_{night}"
+            matches = [
+                (0, 1, "2-1", 1), (2, 3, "0-2", 1), (4, 5, "2-0", 1), (0, 3, "1-2", 2),
+                (5, 1, "2-1", -1), (2, 4, "-1-0", -1), (0, 5, "2-0", 3), (1, 4, "3-1", -2),
+            ]
+            tournaments[slug] = (night, [person.display_name for person in group], matches)
+            Bracket.objects.create(
+                sn=sn, title="Bracket", rank=1,
+                url=f"{challonge_logic.CHALLONGE_URL_PREFIX}{slug}", game_title=self.game_title,
+            )
+            Match.original_objects.create(
+                sn=sn, p1=group[5], p2=group[0], p1_wins=3, p2_wins=1, type=Match.CHALLENGE, game_title=self.game_title,
+            )
+        self.fake_challonge = FakeChallonge(tournaments)
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.enterContext(override_settings(CHALLONGE_CACHE_DIR=cache_dir.name))
+        self.enterContext(mock.patch.object(challonge_logic, "get_http_client", self.fake_challonge.get_http_client))
+        self.enterContext(mock.patch.dict("os.environ", {"CHALLONGE_USER": "user", "CHALLONGE_KEY": "key"}))
+        for sn in self.sns:
+            full_update(sn, cache_mode=CACHE_BYPASS)
+        self.people_before_fix = self.get_scores()["people"]
+
+    def get_scores(self):
+        """Every column a full update or a replay writes"""
+        return {
+            "matches": {
+                pk: values for pk, *values in Match.original_objects.filter(sn__in=self.sns).values_list(
+                    "pk", "p1_score", "p2_score", "p1_score_change", "p2_score_change")
+            },
+            "attendees": {
+                (sn_id, person_id): values for sn_id, person_id, *values in Attendee.objects.filter(
+                    sn__in=self.sns).values_list("sn", "person", "start_seed", "end_seed", "start_score", "end_score")
+            },
+            "snapshots": {
+                (sn_id, person_id): values for sn_id, person_id, *values in PersonSnapshot.objects.filter(
+                    sn__in=self.sns).values_list("sn", "person", "start_rank", "start_score", "end_rank", "end_score")
+            },
+            "people": {pk: values for pk, *values in Person.objects.values_list("pk", "score", "rank")},
+        }
+
+    def test_replay_matches_sequential_updates(self):
+        # Fix a result from the first night, after every night has been updated
+        tournament_id, names, matches = self.fake_challonge.tournaments["sncrs_replay_1"]
+        matches[0] = (0, 1, "1-2", 1)
+
+        # Sequential path: update every night again, in order
+        with transaction.atomic():
+            for sn in self.sns:
+                full_update(sn, cache_mode=CACHE_BYPASS)
+            sequential_scores = self.get_scores()
+            transaction.set_rollback(True)
+
+        # Replay path: update the fixed night, then replay the season
+        full_update(self.sns[0], cache_mode=CACHE_BYPASS)
+        season_data = load_season(1)
+        write_replay(season_data, replay_season(season_data))
+        replayed_scores = self.get_scores()
+
+        self.assertNotEqual(sequential_scores["people"], self.people_before_fix)
+        for table in sequential_scores:
+            with self.subTest(table=table):
+                self.assertEqual(replayed_scores[table], sequential_scores[table])
+
+
+class GridQueryTests(TestCase):
+
+    def create_season(self, count):
+        """Three SmashNights where every other one of count members attends"""
+        people = create_people(count, prefix=f"Season{count}Player")
+        sns = []
+        for night in range(3):
+            sn = SmashNight.objects.create(
+                season=count, date=datetime.date(2026, 1, 1) + datetime.timedelta(weeks=night)
+            )
+            sns.append(sn)
+            for seed, person in enumerate(people[night % 2::2], start=1):
+                Attendee.objects.create(sn=sn, person=person, start_seed=seed, end_seed=seed)
+                PersonSnapshot.objects.create(person=person, sn=sn, end_rank=seed, end_score=person.score)
+        return people, sns
+
+    def assert_constant_queries(self, get_grid, check_grid):
+        people, sns = self.create_season(6)
+        with CaptureQueriesContext(connection) as queries:
+            grid = get_grid(people, sns)
+        check_grid(people, sns, grid)
+        # Five times as many rows take the same queries
+        people, sns = self.create_season(30)
+        with self.assertNumQueries(len(queries)):
+            grid = get_grid(people, sns)
+        check_grid(people, sns, grid)
+
+    def test_week_grid(self):
+        def check_grid(people, sns, grid):
+            self.assertEqual([person for person, _ in grid], people)
+            person, cells = grid[0]
+            self.assertEqual(cells, [(1, person.score), (EMPTY_CELL, EMPTY_CELL), (1, person.score)])
+
+        self.assert_constant_queries(get_week_grid, check_grid)
+
+    def test_placement_grid(self):
+        def check_grid(people, sns, grid):
+            self.assertEqual([person for person, _ in grid], people)
+            _, cells = grid[1]
+            self.assertEqual(cells[0], (EMPTY_CELL, EMPTY_CELL, EMPTY_CELL))
+            self.assertEqual(cells[1][:2], (1, 1))
+
+        self.assert_constant_queries(get_placement_grid, check_grid)
+
+    def test_matchup_cell_without_a_type(self):
+        # A matchup with wins that isn't in any matchup type's range gets no background color
+        game_title, _ = GameTitle.objects.get_or_create(name="SSBU")
+        people = create_people(2)
+        Matchup.objects.create(
+            px=people[0], py=people[1], game_title=game_title, px_wins=2, py_wins=1, px_set_wins=1, py_set_wins=0,
+        )
+        [(_, game_rows, set_rows)] = get_matchup_grids(people, [game_title])
+        self.assertEqual(game_rows[0][1][1], ("", "2:1"))
+        self.assertEqual(set_rows[0][1][1], ("", "1:0"))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class PlayerProfileQueryTests(TestCase):
+
+    def setUp(self):
+        ssbu, _ = GameTitle.objects.get_or_create(name="SSBU")
+        self.game_titles = [ssbu, GameTitle.objects.create(name="Test Game")]
+        self.characters = create_characters(self.game_titles)
+        cache.clear()
+
+    def test_get_player_profiles(self):
+        people = create_members(5, self.game_titles, self.characters)
+        with CaptureQueriesContext(connection) as queries:
+            player_profiles = get_player_profiles(people, self.game_titles)
+        # Four times as many members take the same queries
+        people = create_members(20, self.game_titles, self.characters)
+        with self.assertNumQueries(len(queries)):
+            player_profiles = get_player_profiles(people, self.game_titles)
+
+        game_title, rows = player_profiles[1]
+        self.assertEqual(game_title, self.game_titles[1])
+        person, profile = rows[0]
+        self.assertEqual(person, people[0])
+        self.assertEqual(profile.medal.game_title, game_title)
+        self.assertEqual([main.character for main in profile.mains], self.characters[game_title.pk][:3])
+        self.assertEqual(profile.rivals, [people[1].display_name, people[2].display_name])
+        self.assertEqual(profile.demons, [people[3].display_name])
+
+    def test_players_page(self):
+        create_members(5, self.game_titles, self.characters)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/players/")
+        self.assertContains(response, "Group5Player4")
+        create_members(20, self.game_titles, self.characters)
+        cache.clear()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get("/players/")
+        self.assertContains(response, "Group20Player19")
+
+
+class PersonApiQueryTests(TestCase):
+
+    def setUp(self):
+        ssbu, _ = GameTitle.objects.get_or_create(name="SSBU")
+        self.game_titles = [ssbu, GameTitle.objects.create(name="Test Game")]
+        self.characters = create_characters(self.game_titles)
+        self.site = Site.objects.create(name="twitch")
+
+    def create_people(self, count):
+        people = create_members(count, self.game_titles, self.characters)
+        for person in people:
+            Alias.objects.create(person=person, name=f"{person.display_name} alias")
+            SocialLink.objects.create(site=self.site, person=person, url=f"https://example.com/{person.pk}")
+        return people
+
+    def test_query_count(self):
+        # The people with their teams, one query for each of their aliases, mains,
+        # social links, medals and rivalries, and the game titles, however many people there are
+        for count in (5, 25):
+            people = self.create_people(count)
+            with self.assertNumQueries(7):
+                response = self.client.get("/api/people/")
+            self.assertEqual(response.status_code, 200)
+            person = next(row for row in response.json() if row["id"] == people[0].pk)
+            self.assertIn(f"{people[0].display_name} alias", person["all_names"])
+
+
+class PaginatedApiTests(TestCase):
+
+    def setUp(self):
+        people = create_people(3)
+        sns = [SmashNight.objects.create(season=1, date=datetime.date(2024, 1, day), night_count=day) for day in (1, 2)]
+        for sn in reversed(sns):
+            for person in people:
+                PersonSnapshot.objects.create(person=person, sn=sn, end_rank=1, end_score=person.score)
+        self.snapshot_ids = list(PersonSnapshot.objects.order_by('pk').values_list('pk', flat=True))
+
+    def test_pages_and_stream_share_an_order(self):
+        page_ids = []
+        url = "/api/snapshots/?page_size=4"
+        while url:
+            page = self.client.get(url).json()
+            page_ids += [row["id"] for row in page["results"]]
+            url = page["next"]
+        response = self.client.get("/api/snapshots/?format=ndjson")
+        stream_ids = [json.loads(line)["id"] for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(page_ids, self.snapshot_ids)
+        self.assertEqual(stream_ids, self.snapshot_ids)
+
+    def test_small_lists_are_not_paginated(self):
+        self.assertIsInstance(self.client.get("/api/smashnights/").json(), list)
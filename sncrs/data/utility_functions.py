@@ -1,47 +1,38 @@
 # utility_functions.py
 
 from .models import Person, Matchup
+from .scoring_logic import get_competition_ranks
 # import pandas
 import os
-from django.db.models import Q, Sum
+from django.db.models import Q
 
 
-# calculate ranks given scores
+# calculate competition ranks ("1, 2, 2, 4") given scores
+# only the rank column is written, and only for people whose rank changed
 def assign_score_based_ranks(person_list):
-    sorted_list = sorted(person_list, key=lambda current_person: -current_person.score)
-    c_rank = 1
-    prev_score = 0
-    people_to_add = []
-    for person in sorted_list:
-        if person.score != prev_score:
-            if len(people_to_add) != 0:
-                for add_person in people_to_add:
-                    add_person.rank = c_rank
-                    add_person.save()
-                c_rank += len(people_to_add)
-                people_to_add = []
-            prev_score = person.score
-        people_to_add.append(person)
-    for add_person in people_to_add:
-        add_person.rank = c_rank
-        add_person.save()
-    return
+    people = list(person_list)
+    ranks = get_competition_ranks({person.pk: person.score for person in people})
+    changed_people = []
+    for person in people:
+        if person.rank != ranks[person.pk]:
+            person.rank = ranks[person.pk]
+            changed_people.append(person)
+    Person.objects.bulk_update(changed_people, ['rank'], batch_size=1000)
+    return ranks
 
 
 # update everyone's scores based on if they are an attendee or not
+# attendees take their end score, anyone else who played adds their match score changes
 def update_all_scores(sn):
-    attendees = Person.objects.filter(attendee__sn=sn).distinct()
-    non_attendee_scorers = Person.objects.exclude(pk__in=attendees).filter(Q(p1_match_set__sn=sn) | Q(p2_match_set__sn=sn)).distinct()
-    for c_person in attendees:
-        c_person.score = c_person.attendee_set.get(sn=sn).end_score
-        c_person.save()
-    for c_person in non_attendee_scorers:
-        c_person.score = (
-            c_person.score
-            + c_person.p1_match_set.filter(sn=sn).aggregate(Sum('p1_score_change', default=0))['p1_score_change__sum']
-            + c_person.p2_match_set.filter(sn=sn).aggregate(Sum('p2_score_change', default=0))['p2_score_change__sum']
-        )
-        c_person.save()
+    people = list(
+        Person.objects.set_sn_results(sn).filter(Q(is_attendee=True) | Q(played_matches=True))
+    )
+    for c_person in people:
+        if c_person.is_attendee:
+            c_person.score = c_person.attendee_end_score
+        else:
+            c_person.score = c_person.score + c_person.p1_score_changes + c_person.p2_score_changes
+    Person.objects.bulk_update(people, ['score'], batch_size=1000)
     return
 
 
@@ -1,26 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Func, F
+from django.db.models import Func, F, Prefetch
 from django.db.models.functions import Lower
 
 from data.models import (
     Match, PersonSnapshot, Person, Team,
     StageType, SmashNight, Venue, Greeting,
     Matchup, Medal, Clip, ClipTag, Quote, QuoteTag, Whine,
-    SocialLink, Lesson, TwitchToken, GameTitle,
+    SocialLink, Lesson, TwitchToken, GameTitle, PersonRivalry, PreferredCharacter,
 )
 from data.serializers import (
     MatchSerializer, SnapshotSerializer, SmashNightSerializer,
     PersonSerializer, GreetingSerializer, MatchupSerializer, MedalSerializer, ClipSerializer,
     ClipTagSerializer, QuoteSerializer, QuoteTagSerializer, WhineSerializer,
     SocialLinkSerializer, LessonSerializer, TwitchTokenSerializer,
-    GameTitleSerializer,
+    GameTitleSerializer, ScoringSimulationSerializer,
 )
 from data.filters import (
     MatchFilter, SnapshotFilter, SmashNightFilter, PersonFilter,
     GreetingFilter, MatchupFilter, MedalFilter, ClipFilter, QuoteFilter, WhineFilter,
     SocialLinkFilter, LessonFilter, GameTitleFilter,
 )
-from rest_framework import generics, permissions
+from data.cache_logic import get_cached_content, get_data_version
+from data.grid_logic import get_week_grid, get_placement_grid, get_matchup_grids, get_matchup_grid_data
+from data.profile_logic import get_player_profiles
+from data.replay_logic import load_season, replay_season
+from data.pagination import KeysetPagination
+from data.renderers import NDJSONRenderer, render_line
+from data.scoring_logic import DEFAULT_SCORING
+from rest_framework import generics, permissions, views
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+from dataclasses import asdict
+from itertools import islice
 
 
 def initialize_sn_set(request):
@@ -38,79 +56,118 @@ def initialize_sn_set(request):
     return season_list, smashnight_set, season_selection
 
 
-def home_view(request, *args, **kwargs):
-    person_queryset = Person.objects.filter(tag=Person.MEMBER).order_by("-score")
-    team_queryset = Team.objects.exclude(name="GUEST")
+def get_home_context():
+    context = {
+        "person_list": Person.objects.filter(tag=Person.MEMBER).order_by("-score"),
+        "team_list": Team.objects.exclude(name="GUEST"),
+        "latest_brackets": [],
+        "snapshot_set": [],
+        "score_sorted_snapshots": [],
+    }
     try:
         latest_sn = SmashNight.objects.latest('date')
-        latest_brackets = latest_sn.bracket_set.order_by('rank')
-        snapshot_set = sorted(
-            latest_sn.personsnapshot_set.all(),
-            key=lambda k: -1*(k.end_score - k.start_score)
-        )
-        score_sorted_snapshots = sorted(
-            latest_sn.personsnapshot_set.all(),
-            key=lambda k: -1*k.end_score
-        )
     except SmashNight.DoesNotExist:
-        latest_brackets = []
-        snapshot_set = []
-        score_sorted_snapshots = []
+        return context
+    context["latest_brackets"] = latest_sn.bracket_set.order_by('rank')
+    context["snapshot_set"] = sorted(
+        latest_sn.personsnapshot_set.all(),
+        key=lambda k: -1*(k.end_score - k.start_score)
+    )
+    context["score_sorted_snapshots"] = sorted(
+        latest_sn.personsnapshot_set.all(),
+        key=lambda k: -1*k.end_score
+    )
+    return context
+
 
+def home_view(request, *args, **kwargs):
     context = {
-        "person_list": person_queryset,
-        "team_list": team_queryset,
-        "latest_brackets": latest_brackets,
-        "snapshot_set": snapshot_set,
-        "score_sorted_snapshots": score_sorted_snapshots
+        "page_content": get_cached_content("home", "data/home_content.html", get_home_context),
     }
     return render(request, "data/home.html", context)
 
 
+def get_week_context(smashnight_set):
+    smashnight_list = list(smashnight_set)
+    person_list = Person.objects.filter(tag=Person.MEMBER).select_related('team').order_by('team', 'display_name')
+    return {
+        "smashnight_set": smashnight_list,
+        "week_grid": get_week_grid(list(person_list), smashnight_list),
+        "column_count": len(smashnight_list)*2 + 1,
+    }
+
+
 def week_view(request, *args, **kwargs):
     season_list, smashnight_set, season_selection = initialize_sn_set(request)
-    person_list = Person.objects.filter(tag=Person.MEMBER).order_by('team', 'display_name')
-    column_count = smashnight_set.count()*2 + 1
     context = {
-        "smashnight_set": smashnight_set,
-        "person_list": person_list,
-        "column_count": column_count,
+        "page_content": get_cached_content(
+            "week", "data/week_content.html", lambda: get_week_context(smashnight_set), season_selection
+        ),
         "season_list": season_list,
-        "season_selection": season_selection
+        "season_selection": season_selection,
     }
     return render(request, "data/week.html", context)
 
 
+def get_placement_scores_context(smashnight_set):
+    smashnight_list = list(smashnight_set)
+    person_list = Person.objects.filter(tag=Person.MEMBER).select_related('team').order_by('team', 'display_name')
+    return {
+        "smashnight_set": smashnight_list,
+        "placement_grid": get_placement_grid(list(person_list), smashnight_list),
+        "column_count": len(smashnight_list)*3 + 1,
+    }
+
+
 def placement_scores_view(request, *args, **kwargs):
     season_list, smashnight_set, season_selection = initialize_sn_set(request)
-    person_list = Person.objects.filter(tag=Person.MEMBER).order_by('team', 'display_name')
-    column_count = smashnight_set.count()*3 + 1
     context = {
-        "smashnight_set": smashnight_set,
-        "person_list": person_list,
-        "column_count": column_count,
+        "page_content": get_cached_content(
+            "placement_scores", "data/placement_scores_content.html",
+            lambda: get_placement_scores_context(smashnight_set), season_selection
+        ),
         "season_list": season_list,
-        "season_selection": season_selection
+        "season_selection": season_selection,
     }
     return render(request, "data/placement_scores.html", context)
 
 
+def get_players_context():
+    person_list = list(Person.objects.filter(tag=Person.MEMBER).select_related('team'))
+    return {
+        "player_profiles": get_player_profiles(person_list, list(GameTitle.objects.all())),
+    }
+
+
 def players_view(request, *args, **kwargs):
-    person_list = Person.objects.filter(tag=Person.MEMBER)
-    game_title_list = GameTitle.objects.all()
     context = {
-        "person_list": person_list,
-        "game_title_list": game_title_list,
+        "page_content": get_cached_content("players", "data/players_content.html", get_players_context),
     }
     return render(request, "data/players.html", context)
 
 
+def get_matchups_context():
+    person_list = list(Person.objects.filter(tag=Person.MEMBER).order_by(Lower('display_name')))
+    return {
+        "person_list": person_list,
+        "matchup_grids": get_matchup_grids(person_list, list(GameTitle.objects.all())),
+    }
+
+
 def matchups_view(request, *args, **kwargs):
-    person_list = Person.objects.filter(tag=Person.MEMBER).order_by(Lower('display_name'))
-    game_title_list = GameTitle.objects.all()
+    # ?format=json sends the grids in a compact form for the browser to draw
+    if request.GET.get('format') == 'json':
+        grid_data = cache.get_or_set(
+            f"matchups_json:{get_data_version()}",
+            lambda: get_matchup_grid_data(
+                list(Person.objects.filter(tag=Person.MEMBER).order_by(Lower('display_name'))),
+                list(GameTitle.objects.all()),
+            ),
+            settings.PAGE_CACHE_TIMEOUT,
+        )
+        return JsonResponse(grid_data)
     context = {
-        "person_list": person_list,
-        "game_title_list": game_title_list,
+        "page_content": get_cached_content("matchups", "data/matchups_content.html", get_matchups_context),
     }
     return render(request, "data/matchups.html", context)
 
@@ -137,7 +194,7 @@ def scoring_detail_view(request, c_id):
         "column_count": column_count,
         "matches": matches,
         "season_list": season_list,
-        "season_selection": season_selection
+        "season_selection": season_selection,
     }
     return render(request, "data/scoring_detail.html", context)
 
@@ -177,48 +234,89 @@ def hotkeys_view(request, hotkey_type: str, *args, **kwargs):
     return render(request, "data/hotkeys.html", context)
 
 
-class MatchList(generics.ListAPIView):
-    queryset = Match.objects.all()
+class StreamingListMixin:
+    """
+    Let a list view stream every matching row as NDJSON, with ?format=ndjson,
+    a .ndjson suffix, or an Accept: application/x-ndjson header.
+    Rows are read from a server-side cursor and written as they are serialized,
+    so a full export doesn't have to fit in memory. Rows are streamed in the
+    same order as the view's other formats, including its pages if it has any.
+    """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != NDJSONRenderer.format:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(self.paginator, CursorPagination):
+            queryset = queryset.order_by(*self.paginator.get_ordering(request, queryset, self))
+        return StreamingHttpResponse(self.stream_rows(queryset), content_type=NDJSONRenderer.media_type)
+
+    def stream_rows(self, queryset):
+        # Serialize a chunk at a time, sharing one context so per-response lookups run once
+        context = self.get_serializer_context()
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            for row in self.get_serializer(chunk, many=True, context=context).data:
+                yield render_line(row)
+
+
+class MatchList(StreamingListMixin, generics.ListAPIView):
+    queryset = Match.objects.select_related('p1', 'p2')
     serializer_class = MatchSerializer
     filterset_class = MatchFilter
+    # This list grows with every SmashNight, so it is read a page at a time
+    pagination_class = KeysetPagination
 
-class SnapshotList(generics.ListAPIView):
-    queryset = PersonSnapshot.objects.all()
+class SnapshotList(StreamingListMixin, generics.ListAPIView):
+    queryset = PersonSnapshot.objects.select_related('person', 'sn')
     serializer_class = SnapshotSerializer
     filterset_class = SnapshotFilter
+    # This list grows with every SmashNight, so it is read a page at a time
+    pagination_class = KeysetPagination
 
-class SmashNightList(generics.ListAPIView):
+class SmashNightList(StreamingListMixin, generics.ListAPIView):
     queryset = SmashNight.objects.all()
     serializer_class = SmashNightSerializer
     filterset_class = SmashNightFilter
 
-class PersonList(generics.ListAPIView):
-    queryset = Person.objects.all()
+class PersonList(StreamingListMixin, generics.ListAPIView):
+    # Everything PersonSerializer reads is loaded up front, so the query count doesn't grow with the people listed
+    queryset = Person.objects.select_related('team').prefetch_related(
+        'alias_set',
+        Prefetch('main_set', queryset=PreferredCharacter.objects.select_related('character__game_title').order_by('order', 'pk')),
+        Prefetch('socials', queryset=SocialLink.objects.select_related('site')),
+        Prefetch('medal_set', queryset=Medal.objects.select_related('game_title')),
+        Prefetch('rivalry_set', queryset=PersonRivalry.objects.select_related('game_title', 'opponent')),
+    )
     serializer_class = PersonSerializer
     filterset_class = PersonFilter
 
-class GreetingList(generics.ListAPIView):
-    queryset = Greeting.objects.all()
+class GreetingList(StreamingListMixin, generics.ListAPIView):
+    queryset = Greeting.objects.select_related('person')
     serializer_class = GreetingSerializer
     filterset_class = GreetingFilter
 
-class MatchupList(generics.ListAPIView):
-    queryset = Matchup.objects.all()
+class MatchupList(StreamingListMixin, generics.ListAPIView):
+    queryset = Matchup.objects.select_related('px', 'py', 'game_title')
     serializer_class = MatchupSerializer
     filterset_class = MatchupFilter
+    # This list grows with every SmashNight, so it is read a page at a time
+    pagination_class = KeysetPagination
 
-class MedalList(generics.ListAPIView):
-    queryset = Medal.objects.all()
+class MedalList(StreamingListMixin, generics.ListAPIView):
+    queryset = Medal.objects.select_related('person', 'game_title')
     serializer_class = MedalSerializer
     filterset_class = MedalFilter
 
-class ClipList(generics.ListCreateAPIView):
+class ClipList(StreamingListMixin, generics.ListCreateAPIView):
     queryset = Clip.objects.all()
     serializer_class = ClipSerializer
     filterset_class = ClipFilter
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class ClipTagList(generics.ListCreateAPIView):
+class ClipTagList(StreamingListMixin, generics.ListCreateAPIView):
     queryset = ClipTag.objects.all()
     serializer_class = ClipTagSerializer
 
@@ -227,23 +325,23 @@ class ClipDeleteEditView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ClipSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class WhineList(generics.ListAPIView):
-    queryset = Whine.objects.all()
+class WhineList(StreamingListMixin, generics.ListAPIView):
+    queryset = Whine.objects.select_related('person')
     serializer_class = WhineSerializer
     filterset_class = WhineFilter
 
-class SocialLinkList(generics.ListAPIView):
-    queryset = SocialLink.objects.all()
+class SocialLinkList(StreamingListMixin, generics.ListAPIView):
+    queryset = SocialLink.objects.select_related('person', 'site')
     serializer_class = SocialLinkSerializer
     filterset_class = SocialLinkFilter
 
-class QuoteList(generics.ListCreateAPIView):
+class QuoteList(StreamingListMixin, generics.ListCreateAPIView):
     queryset = Quote.objects.all()
     serializer_class = QuoteSerializer
     filterset_class = QuoteFilter
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class QuoteTagList(generics.ListCreateAPIView):
+class QuoteTagList(StreamingListMixin, generics.ListCreateAPIView):
     queryset = QuoteTag.objects.all()
     serializer_class = QuoteTagSerializer
 
@@ -252,17 +350,84 @@ class QuoteDeleteView(generics.RetrieveDestroyAPIView):
     serializer_class = QuoteSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class LessonList(generics.ListAPIView):
+class LessonList(StreamingListMixin, generics.ListAPIView):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     filterset_class = LessonFilter
 
-class TwitchTokenList(generics.ListCreateAPIView):
+class TwitchTokenList(StreamingListMixin, generics.ListCreateAPIView):
     queryset = TwitchToken.objects.all()
     serializer_class = TwitchTokenSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class GameTitleList(generics.ListAPIView):
+class GameTitleList(StreamingListMixin, generics.ListAPIView):
     queryset = GameTitle.objects.all()
     serializer_class = GameTitleSerializer
-    filterset_class = GameTitleFilter
\ No newline at end of file
+    filterset_class = GameTitleFilter
+
+
+class ScoringSimulationView(views.APIView):
+    """
+    Replay a season under alternate scoring parameters, given as query parameters,
+    and return the resulting member rankings and score trajectories, keyed by person id.
+    Nothing is written to the database.
+    """
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'scoring_simulation'
+
+    @staticmethod
+    def get_standings(data, result) -> dict:
+        """Each member's final rank and score, and their score after each night"""
+        return {
+            'ranks': result.ranks,
+            'scores': {person_id: result.scores[person_id] for person_id in result.ranks},
+            'trajectories': {
+                person_id: [result.score_history[sn.pk][person_id] for sn in data.sns] for person_id in result.ranks
+            },
+            'nights': [{'id': sn.pk, 'date': sn.date, 'title': sn.title} for sn in data.sns],
+        }
+
+    def get(self, request, *args, **kwargs):
+        serializer = ScoringSimulationSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        season = serializer.validated_data['season']
+        parameters = serializer.get_parameters()
+
+        # The standings under the default rules only change with the data, so they are cached
+        data = None
+        default_key = f"scoring_simulation:{season}:{get_data_version()}"
+        default_standings = cache.get(default_key)
+        if default_standings is None:
+            data = load_season(season)
+            if not data.sns:
+                raise NotFound("No SmashNights were found for this season")
+            default_standings = self.get_standings(data, replay_season(data))
+            cache.set(default_key, default_standings, settings.PAGE_CACHE_TIMEOUT)
+        if parameters == DEFAULT_SCORING:
+            standings = default_standings
+        else:
+            data = data or load_season(season)
+            try:
+                standings = self.get_standings(data, replay_season(data, parameters))
+            except OverflowError:
+                raise ValidationError("These scoring parameters make the scores too large to compute")
+
+        names = dict(Person.objects.filter(pk__in=standings['ranks']).values_list('pk', 'display_name'))
+        rankings = [
+            {
+                'id': person_id,
+                'person': names[person_id],
+                'rank': rank,
+                'score': standings['scores'][person_id],
+                'default_rank': default_standings['ranks'][person_id],
+                'default_score': default_standings['scores'][person_id],
+            }
+            for person_id, rank in sorted(standings['ranks'].items(), key=lambda item: (item[1], names[item[0]]))
+        ]
+        return Response({
+            'season': season,
+            'parameters': asdict(parameters),
+            'nights': standings['nights'],
+            'rankings': rankings,
+            'trajectories': standings['trajectories'],
+        })
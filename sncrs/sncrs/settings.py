@@ -122,7 +122,11 @@ USE_TZ = True
 
 
 REST_FRAMEWORK = {
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # The scoring simulation replays a whole season, so each client can only run a few
+    'DEFAULT_THROTTLE_RATES': {
+        'scoring_simulation': os.environ.get('SCORING_SIMULATION_RATE', '30/hour'),
+    },
 }
 
 # Static files (CSS, JavaScript, Images)
@@ -134,6 +138,23 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Challonge responses are cached here. Completed tournaments never expire,
+# others expire after CHALLONGE_CACHE_TTL seconds
+CHALLONGE_CACHE_DIR = BASE_DIR / "cache" / "challonge"
+CHALLONGE_CACHE_TTL = int(os.environ.get('CHALLONGE_CACHE_TTL', 600))
+
+# Rendered public pages are cached on disk, so every server worker shares them.
+# A recompute or an admin edit bumps the data version and makes them stale.
+# PAGE_CACHE_TIMEOUT is how long a stale page can stay on disk
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / "cache" / "pages",
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    }
+}
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -0,0 +1,13 @@
+#!/usr/bin/env bash
+# start-worker.sh
+# Runs the background job worker for long admin actions, as its own service
+echo 'Waiting for postgres...'
+
+while ! nc -z $DB_HOSTNAME $DB_PORT; do
+    sleep 0.1
+done
+
+echo 'PostgreSQL started'
+
+# The worker exits if the web service hasn't migrated the database yet, and is restarted
+cd /sncrs/ && exec python manage.py run_jobs